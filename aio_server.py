@@ -0,0 +1,128 @@
+"""
+Treasure Grid – asyncio server
+──────────────────────────────
+• Same JSON-lines protocol as server.py, but every connection runs as a
+  coroutine on a single event loop and the shared Scheduler is driven from
+  that loop – no thread per client and no thread per timer.
+• Memory per connection is bounded: input lines are capped at MAX_LINE and
+  a client whose unsent output grows past max_backlog bytes is dropped.
+"""
+
+import asyncio
+import json
+
+from ratelimit import RATE_LIMITS
+from room import BOARD_SIZE, Player
+from server import HOST, MAX_BACKLOG, PORT, TreasureServer
+from wire import FROM_CLIENT, WIRES, aread_msg
+
+# ─────────────────── configuration ───────────────────────────────────
+MAX_LINE = 64 * 1024         # longest accepted request line (bytes)
+
+
+# =====================================================================
+class AsyncTreasureServer(TreasureServer):
+    def __init__(self, host: str = HOST, port: int = PORT,
+                 max_backlog: int = MAX_BACKLOG, batch_ms: int = 0,
+                 wires=WIRES, log_dir: str = None,
+                 board_size: int = BOARD_SIZE, rate_limits: dict = RATE_LIMITS):
+        super().__init__(host, port, max_backlog, batch_ms, wires, log_dir,
+                         board_size, rate_limits)
+        self.loop  = None
+        self._wake = None
+        self.scheduler.wakeup = lambda: self._wake.set()
+
+    # ────────────────── transport hooks ──────────────────────────────
+    def _send_to(self, p: Player, data: bytes):
+        writer = p.sock
+        if writer.is_closing(): return
+        backlog = writer.transport.get_write_buffer_size()
+        writer.write(data)
+        p.sent += len(data)
+        # slow consumer: cut it loose instead of buffering without bound
+        if backlog and backlog + len(data) > self.max_backlog:
+            p.evicted = True
+            writer.transport.abort()
+
+    def _disconnect(self, p: Player):
+        p.sock.close()                           # flushes, then closes
+
+    def bytes_out(self, p: Player) -> int:
+        # written to the transport, not necessarily to the kernel yet
+        return p.sent
+
+    def queue_depths(self) -> dict:
+        # the transport is the queue; it only knows its size in bytes
+        return {p.pid: {"bytes": p.sock.transport.get_write_buffer_size()}
+                for room in list(self.rooms.values()) for p in room.conns}
+
+    # ────────────────── per-client coroutine ─────────────────────────
+    async def _client(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter):
+        room = pid = None
+        try:
+            room, pid = self._register(writer, None, None,
+                                       await self._aread(reader))
+            while True:
+                msg = await self._aread(reader)
+                if msg is None: break
+                if msg: room.handle(pid, msg)
+        finally:
+            if pid is not None: self._unregister(room, pid)
+            writer.close()
+
+    @staticmethod
+    async def _aread(reader):
+        """
+        Next message; {} for an unparsable line or one that is not an
+        object, None at EOF / bad input.
+        """
+        try:
+            msg = await aread_msg(reader, FROM_CLIENT)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {}
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            return None  # reset, bad frame, or line over MAX_LINE
+        return msg if msg is None or isinstance(msg, dict) else {}
+
+    # ────────────────── main loop ────────────────────────────────────
+    def adopt(self, conn):
+        # may be called from any thread once self.ready is set
+        self.loop.call_soon_threadsafe(self.loop.create_task,
+                                       self._adopt(conn))
+
+    async def _adopt(self, conn):
+        reader, writer = await asyncio.open_connection(sock=conn,
+                                                       limit=MAX_LINE)
+        await self._client(reader, writer)
+
+    async def _drive_scheduler(self):
+        """Fire due timers on the loop thread; sleep until the next one."""
+        while True:
+            self._wake.clear()
+            self.scheduler.run_due()
+            try:
+                await asyncio.wait_for(self._wake.wait(),
+                                       self.scheduler.next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _serve(self, listen: bool):
+        self.loop  = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        driver = asyncio.create_task(self._drive_scheduler())
+        self.ready.set()
+        try:
+            if not listen:                       # connections come via adopt()
+                await asyncio.Event().wait()
+            server = await asyncio.start_server(self._client, self.host,
+                                                self.port, limit=MAX_LINE)
+            print(f"[SERVER] Listening on {self.port} (asyncio) …")
+            async with server:
+                await server.serve_forever()
+        finally:
+            driver.cancel()
+            print("[SERVER] Server loop ended.")
+
+    def serve_forever(self, listen: bool = True):
+        asyncio.run(self._serve(listen))
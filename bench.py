@@ -0,0 +1,266 @@
+"""
+Treasure Grid – benchmark suite
+───────────────────────────────
+Times the hot paths and writes machine-readable results so runs can be
+compared:
+
+  board_init       Board(size) time and peak memory, sizes 10 … 2000
+  board_contended  lock_square + reveal_square throughput vs. thread count
+  handle_msg       Room.handle dispatch rate for CLICK and CHAT
+  round_start      READY → START with a warm board pool vs. building the board
+  broadcast        fan-out cost vs. client count (socketpair stand-ins)
+  start_codec      START layout encode / decode, JSON vs. bin1
+
+    python bench.py --out base.json               # record a baseline
+    python bench.py --compare base.json           # exit 1 on regressions
+    python bench.py --quick --only board_init,start_codec
+
+Every number is "lower is better" except keys ending in _per_s.
+"""
+
+import argparse
+import io
+import json
+import platform
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+
+from board import Board
+from boardpool import BoardPool
+from fanout import Outbox
+from room import NullHost, Player, Room
+from wire import BIN1, ENCODERS, JSON, read_msg
+
+
+def _best(fn, reps: int) -> float:
+    """Fastest of `reps` runs of fn(), in seconds."""
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter(); fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _room(host, players: int, outboxes=None) -> Room:
+    room = Room("bench", host)
+    for pid in range(1, players + 1):
+        out = outboxes[pid - 1] if outboxes else None
+        room.add(pid, Player(out=out))
+    return room
+
+
+# ────────────────── benchmarks ───────────────────────────────────────
+def bench_board_init(quick: bool) -> dict:
+    res = {}
+    for size in ((10, 100, 500) if quick else (10, 100, 500, 1000, 2000)):
+        reps = 3 if size >= 1000 else 10
+        t = _best(lambda: Board(size, seed=1), reps)
+        tracemalloc.start()
+        b = Board(size, seed=1)
+        kept, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop(); del b
+        res[str(size)] = {"ms": round(t * 1e3, 3),
+                          "kept_kb": round(kept / 1024, 1),
+                          "peak_kb": round(peak / 1024, 1)}
+    return res
+
+
+def bench_board_contended(quick: bool) -> dict:
+    size = 100 if quick else 300
+    res = {}
+    for threads in (1, 2, 4, 8, 16):
+        board = Board(size, seed=1)
+        rows  = [range(t, size, threads) for t in range(threads)]
+        start = threading.Barrier(threads + 1)
+
+        def player(pid, my_rows):
+            start.wait()
+            for r in my_rows:
+                for c in range(size):
+                    if board.lock_square(r, c, pid):
+                        board.reveal_square(r, c, pid)
+
+        ts = [threading.Thread(target=player, args=(i + 1, rows[i]))
+              for i in range(threads)]
+        for t in ts: t.start()
+        start.wait(); t0 = time.perf_counter()
+        for t in ts: t.join()
+        dt = time.perf_counter() - t0
+        res[str(threads)] = {"ops_per_s": round(2 * size * size / dt),
+                             "ms": round(dt * 1e3, 2)}
+    return res
+
+
+def bench_handle_msg(quick: bool) -> dict:
+    n    = 5000 if quick else 40000
+    size = 100 if quick else 200
+    host = NullHost()
+    room = _room(host, players=8)
+    room.game_started, room.board = True, Board(size, seed=1)
+    clicks = [{"type": "CLICK", "row": i // size % size, "col": i % size}
+              for i in range(n)]
+    chats  = [{"type": "CHAT", "msg": f"line {i}"} for i in range(n)]
+    res = {}
+    for label, msgs in (("CLICK", clicks), ("CHAT", chats)):
+        t0 = time.perf_counter()
+        for m in msgs: room.handle(1, m)
+        dt = time.perf_counter() - t0
+        res[label] = {"msgs_per_s": round(n / dt),
+                      "us_per_msg": round(dt / n * 1e6, 2)}
+    return res
+
+
+def bench_round_start(quick: bool) -> dict:
+    res = {}
+    for size in ((10, 100, 500) if quick else (10, 64, 100, 500, 1000)):
+        times = {}
+        for label, depth in (("warm", 1), ("cold", 0)):
+            best = float("inf")
+            for _ in range(3):
+                pool = BoardPool(depth)
+                pool.warm(size)
+                while pool.stats()["ready"] < depth: time.sleep(0.005)
+                room = _room(NullHost(board_size=size, boards=pool), 2)
+                for pid in (1, 2):
+                    room.handle(pid, {"type": "VIEW", "row": 0, "col": 0,
+                                      "rows": 32, "cols": 32})
+                    room.players[pid].ready = True
+                t0 = time.perf_counter(); room._maybe_start_game()
+                best = min(best, time.perf_counter() - t0)
+            times[f"{label}_ms"] = round(best * 1e3, 3)
+        res[str(size)] = times
+    return res
+
+
+def bench_broadcast(quick: bool) -> dict:
+    counts = (1, 16, 64) if quick else (1, 16, 64, 256)
+    n = 200 if quick else 1000
+    msg = {"type": "REVEAL", "row": 3, "col": 4, "player": 1, "coins": 2}
+    frame = len(ENCODERS[JSON](msg))
+    res = {}
+    for clients in counts:
+        pairs = [socket.socketpair() for _ in range(clients)]
+        outs  = [Outbox(a, max_backlog=1 << 30) for a, _ in pairs]
+        room  = _room(NullHost(), clients, outs)
+        done  = threading.Barrier(clients + 1)
+
+        def drain(sock, want):
+            got = 0
+            while got < want:
+                got += len(sock.recv(1 << 16))
+            done.wait()
+
+        for _, b in pairs:
+            threading.Thread(target=drain, args=(b, n * frame),
+                             daemon=True).start()
+        t0 = time.perf_counter()
+        for _ in range(n): room._fan_out(msg)
+        queued = time.perf_counter() - t0
+        done.wait()
+        delivered = time.perf_counter() - t0
+        for o in outs: o.close()
+        for a, b in pairs: a.close(); b.close()
+        res[str(clients)] = {
+            "enqueue_us_per_broadcast": round(queued / n * 1e6, 2),
+            "delivered_ms": round(delivered * 1e3, 2),
+        }
+    return res
+
+
+def bench_start_codec(quick: bool) -> dict:
+    res = {}
+    for size in ((10, 100) if quick else (10, 100, 500, 1000)):
+        msg = {"type": "START", "size": size, "theme": "Classic",
+               "layout": Board(size, seed=1).layout(), "preview": 3}
+        reps = 3 if size >= 500 else 20
+        for wire in (JSON, BIN1):
+            enc  = ENCODERS[wire]
+            blob = enc(msg)
+            t_enc = _best(lambda: enc(msg), reps)
+            t_dec = _best(lambda: read_msg(io.BufferedReader(
+                io.BytesIO(blob))), reps)
+            res[f"{size}/{wire}"] = {"encode_ms": round(t_enc * 1e3, 3),
+                                     "decode_ms": round(t_dec * 1e3, 3),
+                                     "bytes": len(blob)}
+    return res
+
+
+BENCHES = {
+    "board_init":      bench_board_init,
+    "board_contended": bench_board_contended,
+    "handle_msg":      bench_handle_msg,
+    "round_start":     bench_round_start,
+    "broadcast":       bench_broadcast,
+    "start_codec":     bench_start_codec,
+}
+
+
+# ────────────────── comparison ───────────────────────────────────────
+def _flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict): out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)): out[key] = v
+    return out
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Metrics that got worse by more than `threshold` (a fraction)."""
+    worse = []
+    a, b = _flatten(old["results"]), _flatten(new["results"])
+    for key in sorted(a.keys() & b.keys()):
+        before, after = a[key], b[key]
+        if not before: continue
+        change = (after - before) / before
+        if key.endswith("_per_s"): change = -change     # higher is better
+        mark = "  REGRESSION" if change > threshold else ""
+        print(f"{key:<50}{before:>14}{after:>14}{change:>+9.1%}{mark}")
+        if mark: worse.append(key)
+    return worse
+
+
+# =====================================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treasure Grid benchmarks")
+    ap.add_argument("--only", help="comma-separated subset of: "
+                                   + ", ".join(BENCHES))
+    ap.add_argument("--quick", action="store_true",
+                    help="smaller sizes, for a fast sanity run")
+    ap.add_argument("--out", metavar="FILE", help="write results as JSON")
+    ap.add_argument("--compare", metavar="FILE",
+                    help="compare with an earlier --out file")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="relative slowdown counted as a regression "
+                         "(default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHES)
+    run = {"python": platform.python_version(),
+           "machine": platform.machine(), "platform": platform.platform(),
+           "quick": args.quick, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+           "results": {}}
+    for name in names:
+        t0 = time.perf_counter()
+        run["results"][name] = BENCHES[name](args.quick)
+        print(f"[BENCH] {name} ({time.perf_counter() - t0:.1f}s)")
+        print(json.dumps(run["results"][name], indent=2))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(run, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(json.load(f), run, args.threshold)
+        if worse:
+            print(f"[BENCH] {len(worse)} regressions over "
+                  f"{args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,143 @@
 import random
 import threading
+import time
+from array import array
+
+import metrics
 
 class SquareState:
-    """Internal enum for a cell’s state."""
-    HIDDEN   = "hidden"
-    LOCKED   = "locked"
-    REVEALED = "revealed"
+    """Internal enum for a cell’s state (one byte per cell)."""
+    HIDDEN   = 0
+    LOCKED   = 1
+    REVEALED = 2
+
+
+# Distribution (per cell – approx. 30 % bombs):
+#
+#   • –1 ➜ bomb              (3 / 10)
+#   •  1 ➜ bronze coin       (3 / 10)
+#   •  2 ➜ silver coin       (2 / 10)
+#   •  3 ➜ gold   coin       (2 / 10)
+_VALUES = [-1] * 3 + [1] * 3 + [2] * 2 + [3] * 2  # weighted list
+
+# random byte → coin value (as an unsigned byte); lets bytes.translate map a
+# whole buffer of random bytes to cells in one C-level pass
+_TABLE = bytes(_VALUES[b * len(_VALUES) >> 8] & 0xFF for b in range(256))
 
+STRIPES = 64   # lock stripes; row r is guarded by stripe r % STRIPES
 
-class Square:
+
+class Board:
     """
-    A single cell on the board.
+    Thread-safe board with lock / reveal operations.
 
-    Distribution (per cell – approx. 30 % bombs):
+    Cells live in flat packed arrays indexed by row * size + col:
+    coins (signed bytes), state (SquareState bytes) and owner (uint32 player
+    ID, 0 = nobody). A 1000x1000 board takes ~6 MB and generates in a few
+    milliseconds; the same seed always yields the same layout.
 
-      • –1 ➜ bomb              (3 / 10)
-      •  1 ➜ bronze coin       (3 / 10)
-      •  2 ➜ silver coin       (2 / 10)
-      •  3 ➜ gold   coin       (2 / 10)
+    Claims are striped by row: clicks on rows in different stripes never
+    wait for each other, and each stripe keeps its own reveal counter.
     """
-    _VALUES = [-1] * 3 + [1] * 3 + [2] * 2 + [3] * 2  # weighted list
+    def __init__(self, size: int = 10, seed: int = None):
+        self.size     = size
+        self.total    = n = size * size
+        self.seed     = random.getrandbits(64) if seed is None else seed
+        rng           = random.Random(self.seed)
+        raw           = rng.getrandbits(8 * n).to_bytes(n, "little") if n else b""
+        self._coins   = bytearray(raw.translate(_TABLE))
+        self.coins    = memoryview(self._coins).cast("b")  # signed view
+        self.state    = bytearray(n)                       # all HIDDEN
+        self.owner    = array("I", bytes(4 * n))
+        self._stripes = [threading.Lock()
+                         for _ in range(max(1, min(size, STRIPES)))]
+        self._counts  = [0] * len(self._stripes)     # reveals per stripe
+        self._layout  = None                          # layout() rows, built once
 
-    def __init__(self):
-        self.coins = random.choice(self._VALUES)
-        self.state = SquareState.HIDDEN
-        self.owner = None  # player ID who locked / revealed
+    # ── read-only helpers ───────────────────────────────────────────
+    def value(self, row: int, col: int) -> int:
+        """Coins under a square (–1 for a bomb)."""
+        return self.coins[row * self.size + col]
 
+    def layout(self) -> list:
+        """Every cell's coins as a list of rows (for START). Coins never
+        change once dealt, so the rows are built on the first call."""
+        if self._layout is None:
+            s, cells = self.size, self.coins
+            self._layout = [cells[r * s:(r + 1) * s].tolist() for r in range(s)]
+        return self._layout
 
-class Board:
-    """Thread-safe board with lock / reveal operations."""
-    def __init__(self, size: int = 10):
-        self.size     = size
-        self.grid     = [[Square() for _ in range(size)] for _ in range(size)]
-        self._lock    = threading.Lock()
-        self.revealed = 0
-        self.total    = size * size
+    def coins_bytes(self) -> bytes:
+        """Every cell's coins as signed bytes, row-major (for the event log)."""
+        return bytes(self._coins)
+
+    def region(self, row: int, col: int, rows: int, cols: int,
+               hide: bool = True) -> tuple:
+        """
+        (coins, states) of a block as lists of rows, for CHUNK. With hide,
+        cells that are not revealed yet read 0 coins.
+        """
+        coins, states = [], []
+        for r in range(row, row + rows):
+            i = r * self.size + col
+            vals, st = self.coins[i:i + cols].tolist(), list(self.state[i:i + cols])
+            if hide:
+                vals = [v if s == SquareState.REVEALED else 0
+                        for v, s in zip(vals, st)]
+            coins.append(vals); states.append(st)
+        return coins, states
+
+    @property
+    def revealed(self) -> int:
+        return sum(self._counts)
+
+    def _index(self, row: int, col: int) -> int:
+        if 0 <= row < self.size and 0 <= col < self.size:
+            return row * self.size + col
+        return -1
 
     # ── concurrency helpers ──────────────────────────────────────────
+    def _acquire(self, k: int) -> threading.Lock:
+        """Take stripe k, timing the wait when metrics sampling is on."""
+        stripe = self._stripes[k]
+        if metrics.enabled:
+            t0 = time.perf_counter(); stripe.acquire()
+            metrics.observe("board.lock_wait", time.perf_counter() - t0)
+        else:
+            stripe.acquire()
+        return stripe
+
     def lock_square(self, row: int, col: int, player_id: int) -> bool:
         """Try to lock a hidden square for player_id. Return True on success."""
-        with self._lock:
-            sq = self.grid[row][col]
-            if sq.state != SquareState.HIDDEN:
+        i = self._index(row, col)
+        if i < 0: return False
+        stripe = self._acquire(row % len(self._stripes))
+        try:
+            if self.state[i] != SquareState.HIDDEN:
                 return False
-            sq.state, sq.owner = SquareState.LOCKED, player_id
+            self.state[i], self.owner[i] = SquareState.LOCKED, player_id
             return True
+        finally:
+            stripe.release()
 
     def reveal_square(self, row: int, col: int, player_id: int) -> int:
         """
         Reveal a square previously locked by player_id.
         Returns the number of coins (–1 if bomb, 0 if reveal denied).
         """
-        with self._lock:
-            sq = self.grid[row][col]
-            if sq.state != SquareState.LOCKED or sq.owner != player_id:
+        i = self._index(row, col)
+        if i < 0: return 0
+        k = row % len(self._stripes)
+        stripe = self._acquire(k)
+        try:
+            if self.state[i] != SquareState.LOCKED or self.owner[i] != player_id:
                 return 0
-            sq.state = SquareState.REVEALED
-            self.revealed += 1
-            return sq.coins
+            self.state[i] = SquareState.REVEALED
+            self._counts[k] += 1
+            return self.coins[i]
+        finally:
+            stripe.release()
 
     def all_revealed(self) -> bool:
         """Check if every square on the board has been revealed."""
-        return self.revealed >= self.total
\ No newline at end of file
+        return self.revealed >= self.total
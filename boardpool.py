@@ -0,0 +1,80 @@
+"""
+Treasure Grid – board pool
+──────────────────────────
+Rooms deal their board from a BoardPool instead of building it on the
+READY path. The pool keeps `depth` boards per board size built ahead of
+time by a background thread (with layout rows, on boards small enough to
+send whole), so taking one at START costs the same for a 10×10 and a
+1000×1000 board; when the pool runs dry the board is built on the spot and
+counted as a miss.
+
+Every board comes from an explicit 64-bit seed drawn from the OS, and
+START and the event log carry it: Board(size, seed) rebuilds any round's
+layout exactly.
+"""
+
+import collections
+import random
+import threading
+
+from board import Board
+from room import FULL_LAYOUT_MAX
+
+POOL_DEPTH = 2           # ready boards kept per board size
+
+
+class BoardPool:
+    def __init__(self, depth: int = POOL_DEPTH):
+        self.depth   = depth
+        self.hits    = 0                         # takes served from the pool
+        self.misses  = 0                         # takes built on the spot
+        self._ready  = {}                        # size → deque of Boards
+        self._seeds  = random.SystemRandom()
+        self._cond   = threading.Condition()
+        self._thread = None
+
+    def warm(self, size: int):
+        """Keep `depth` boards of this size ready from now on."""
+        with self._cond:
+            self._ready.setdefault(size, collections.deque())
+            if self.depth and self._thread is None:
+                self._thread = threading.Thread(target=self._fill,
+                                                name="board-pool", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def take(self, size: int) -> Board:
+        """A fresh board of this size; also starts keeping that size warm."""
+        with self._cond:
+            ready = self._ready.get(size)
+            board = ready.popleft() if ready else None
+            if board: self.hits += 1
+            else:     self.misses += 1
+        self.warm(size)                          # refill what was taken
+        return board or self.build(size)
+
+    def build(self, size: int) -> Board:
+        board = Board(size, self._seeds.getrandbits(64))
+        if size <= FULL_LAYOUT_MAX:              # larger ones go out as CHUNKs
+            board.layout()                       # cached for START / catch-up
+        return board
+
+    def stats(self) -> dict:
+        with self._cond:
+            ready = sum(len(q) for q in self._ready.values())
+        return {"ready": ready, "hits": self.hits, "misses": self.misses}
+
+    # ────────────────── background thread ────────────────────────────
+    def _short(self):
+        # caller holds self._cond
+        return next((size for size, q in self._ready.items()
+                     if len(q) < self.depth), None)
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                while (size := self._short()) is None:
+                    self._cond.wait()
+            board = self.build(size)             # outside the lock
+            with self._cond:
+                self._ready[size].append(board)
@@ -0,0 +1,155 @@
+"""
+Treasure Grid – headless client
+───────────────────────────────
+BotClient speaks the same protocol as ClientGUI (JOIN with a wire offer,
+then NAME / READY / CLICK / CHAT) without Tk, so scripts and load tests can
+drive a server.
+
+    bot = BotClient("127.0.0.1", 6000, room="lobby")
+    bot.connect()                 # returns after WELCOME
+    bot.start(on_message)         # reader thread; BATCH frames unpacked
+    bot.send({"type": "READY"})
+"""
+
+import socket
+import threading
+import time
+
+from room import DEFAULT_ROOM
+from wire import ENCODERS, JSON, WIRES, read_msg
+
+
+class BotClient:
+    """One scriptable connection, tracking just enough state to play."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 6000,
+                 name: str = "bot", room: str = DEFAULT_ROOM, wires=WIRES,
+                 relay: bool = False):
+        self.host, self.port = host, port
+        self.name, self.room = name, room
+        self.relay        = relay                 # JOIN as a hidden feed
+        self.wires        = list(wires)
+        self.wire         = JSON                  # switched by WELCOME
+        self.sock         = None
+        self.file         = None
+        self.pid          = None
+        self.spectator    = False
+        self.size         = 0
+        self.hidden       = set()                 # cells not yet locked
+        self.connect_time = None                  # seconds until WELCOME
+        self.received     = 0                     # messages, BATCH unpacked
+        self.seq          = 0                     # counted for SEQ checks
+        self.resyncs      = 0                     # RESYNCs requested
+        self.resume       = None                  # token to take the seat back
+        self.clock        = None                  # WELCOME's server clock
+        self.closed       = False
+        self._send_lock   = threading.Lock()
+
+    # ────────────────── connection ───────────────────────────────────
+    def connect(self, timeout: float = 10.0, resume: str = None) -> dict:
+        """
+        Connect, JOIN and wait for WELCOME; returns the WELCOME message.
+        resume: the token from an earlier WELCOME, to get that seat back.
+        """
+        t0 = time.perf_counter()
+        self.sock = socket.create_connection((self.host, self.port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rb")
+        self.closed, self.seq = False, 0
+        join = {"type": "JOIN", "name": self.name, "room": self.room,
+                "wire": self.wires}
+        if resume: join["resume"] = resume
+        if self.relay: join["relay"] = True
+        self.send(join)
+        welcome = self.recv()
+        if not welcome or welcome.get("type") != "WELCOME":
+            raise ConnectionError(f"expected WELCOME, got {welcome!r}")
+        self.connect_time = time.perf_counter() - t0
+        self.sock.settimeout(None)
+        self.pid       = welcome["player"]
+        self.spectator = welcome.get("spectator", False)
+        self.size      = welcome.get("size", 0)
+        self.wire      = welcome.get("wire", JSON)
+        self.clock     = welcome.get("clock")     # server wall clock then
+        self.resume    = welcome.get("resume")
+        self.seq       = 1                        # WELCOME itself
+        return welcome
+
+    def send(self, msg: dict) -> bool:
+        try:
+            with self._send_lock:
+                self.sock.sendall(ENCODERS[self.wire](msg))
+            return True
+        except OSError:
+            return False
+
+    def recv(self):
+        """Next message from the server, or None once the connection ends."""
+        try:
+            return read_msg(self.file)
+        except (ValueError, OSError):
+            return None
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    # ────────────────── reader thread ────────────────────────────────
+    def start(self, on_message=None):
+        """Read in a daemon thread, calling on_message(self, msg) per message."""
+        t = threading.Thread(target=self._reader, args=(on_message,),
+                             daemon=True)
+        t.start()
+        return t
+
+    def _reader(self, on_message):
+        while True:
+            m = self.recv()
+            if m is None: break
+            for sub in (m["msgs"] if m.get("type") == "BATCH" else (m,)):
+                if not self._count(sub): continue
+                self.received += 1
+                self._track(sub)
+                if on_message: on_message(self, sub)
+        self.closed = True
+
+    def _count(self, m: dict) -> bool:
+        """Same gap detection as ClientGUI._count; False for SEQ."""
+        t = m.get("type")
+        if t == "SEQ":
+            if self.seq is not None and self.seq != m["seq"]:
+                self.send({"type": "RESYNC"}); self.resyncs += 1
+                self.seq = None
+            else:
+                self.seq = m["seq"]
+            return False
+        if t == "SNAPSHOT":        self.seq = None
+        elif self.seq is not None: self.seq += 1
+        return True
+
+    def _track(self, m: dict):
+        t = m.get("type")
+        if t == "SNAPSHOT":
+            self.size   = m["size"]
+            self.hidden = {(r, c) for r in range(self.size)
+                           for c in range(self.size)}
+            for i, _, _ in m.get("cells", ()):
+                self.hidden.discard(divmod(i, self.size))
+        elif t == "START":
+            self.size   = m["size"]
+            self.hidden = {(r, c) for r in range(self.size)
+                           for c in range(self.size)}
+        elif t in ("LOCK", "REVEAL"):
+            self.hidden.discard((m["row"], m["col"]))
+        elif t == "CHUNK":
+            for dr, states in enumerate(m["state"]):
+                for dc, st in enumerate(states):
+                    if st: self.hidden.discard((m["row"] + dr, m["col"] + dc))
+
+    def view(self, row: int, col: int, rows: int, cols: int) -> bool:
+        """Subscribe to one region only (see viewport.py)."""
+        return self.send({"type": "VIEW", "row": row, "col": col,
+                          "rows": rows, "cols": cols})
@@ -1,11 +1,25 @@
-import json, queue, random, socket, sys, threading, tkinter as tk
+import collections, math, queue, random, socket, sys, threading, time
+import tkinter as tk
 from tkinter import messagebox
+from gridview import GridCanvas
+from metrics import percentiles
+from room import FULL_LAYOUT_MAX
+from standings import Standings
+from wire import ENCODERS, JSON, WIRES, split_msgs
 
 # ---------------- command-line defaults ------------------------------
 HOST  = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
 PORT  = int(sys.argv[2]) if len(sys.argv) > 2 else 6000
+ROOM  = sys.argv[3] if len(sys.argv) > 3 else "lobby"
 NAME  = "name"
 
+# ---------------- message pump --------------------------------------
+FRAME_BUDGET = 0.008     # seconds of message handling per Tk frame
+SAFETY_POLL  = 250       # ms; backstop in case a wake-up event is lost
+CLOCK_POLL   = 200       # ms between local countdown repaints
+PING_EVERY   = 2000      # ms between PINGs (round-trip time in the header)
+RECV_BYTES   = 256 * 1024   # bytes asked of the socket per read
+
 # ---------------- emoji sets ----------------------------------------
 COMMON_NEG = { -5: "💀", -1: "💣" }    # same for every theme
 
@@ -34,15 +48,35 @@ class ClientGUI(tk.Tk):
 
         # local state
         self.q           = queue.Queue()
+        self.outq        = queue.SimpleQueue()   # encoded bytes; None = stop
         self.players     = {}
+        self.roster_version = None               # PLAYERS version we hold
+        self.standings   = Standings()           # live ranks from SCORE
         self.pid         = None
         self.avatar      = "🙂"
         self.spectator   = False
         self.theme       = "Classic"
         self.in_preview  = False
+        self.wire        = JSON                  # switched by WELCOME
+        self.seq         = 0                     # messages counted, for SEQ
+        self.grid_view   = None                  # GridCanvas once START arrives
+        self._pending    = collections.deque()   # (arrival time, msg) to handle
+        self._wake_sent  = False                 # a <<NetData>> is in flight
+        self._clicked_at = {}                    # (row, col) → click time
+        self._shown      = []                    # click times awaiting paint
+        self.click_to_display = collections.deque(maxlen=2000)   # seconds
+        self.queue_delay = collections.deque(maxlen=2000)   # arrival → handled
+        self.coalesced   = 0                     # SCORE / TIME updates skipped
+        self._view       = None                  # visible region to report
+        self._view_sent  = None                  # last region reported
+        self.clock_offset = 0.0                  # server wall clock − ours
+        self.deadline    = None                  # round end, server clock
+        self.rtt         = None                  # last PING round trip, s
+        self._best_rtt   = float("inf")          # its offset estimate is kept
 
         # header vars
         self.time_var    = tk.StringVar(value="⏳ …")
+        self.rtt_var     = tk.StringVar(value="📶 …")
         self.score_var   = tk.StringVar(value="⭐ 0")
         self.message_var = tk.StringVar(value="")
 
@@ -51,7 +85,10 @@ class ClientGUI(tk.Tk):
         self.current_view = "lobby"
 
         threading.Thread(target=self._net_thread, daemon=True).start()
-        self.after(50, self._pump)
+        self.bind("<<NetData>>", lambda e: self._pump())
+        self.after(SAFETY_POLL, self._safety_poll)
+        self.after(CLOCK_POLL, self._clock_tick)
+        self.after(PING_EVERY, self._ping)
         self.protocol("WM_DELETE_WINDOW", self._close)
 
     def _build_header(self):
@@ -59,6 +96,8 @@ class ClientGUI(tk.Tk):
         hdr.pack(fill="x")
         tk.Label(hdr, textvariable=self.time_var,
                  fg="white", bg="#222").pack(side="left", padx=10)
+        tk.Label(hdr, textvariable=self.rtt_var,
+                 fg="#888", bg="#222").pack(side="left")
         tk.Label(hdr, textvariable=self.score_var,
                  fg="white", bg="#222").pack(side="right", padx=10)
         self.players_lbl = tk.Label(hdr, fg="white", bg="#222")
@@ -124,16 +163,25 @@ class ClientGUI(tk.Tk):
                   command=self._send_chat).pack(side="left", padx=4)
 
     def _build_grid(self, size: int):
-        self.grid = tk.Frame(self, bg="#222")
-        self.grid.pack(expand=True)
-        self.btns = [[None]*size for _ in range(size)]
-        for r in range(size):
-            for c in range(size):
-                b = tk.Button(self.grid, width=3, height=2, bg="#666", fg="white",
-                              relief="flat", font=("Helvetica", 12, "bold"),
-                              command=lambda r=r, c=c: self._click(r, c))
-                b.grid(row=r, column=c, padx=1, pady=1)
-                self.btns[r][c] = b
+        # only chunked boards are filtered by view; small ones arrive whole
+        chunked = size > FULL_LAYOUT_MAX
+        self.grid_view = GridCanvas(self, size, on_click=self._click,
+                                    on_view=self._view_changed if chunked
+                                    else None)
+        self.grid_view.pack(expand=True, fill="both", padx=10, pady=10)
+
+    def _view_changed(self, row, col, rows, cols):
+        # scrolling fires this a lot; report the region at most every 100 ms
+        if self._view is None:
+            self.after(100, self._send_view)
+        self._view = (row, col, rows, cols)
+
+    def _send_view(self):
+        view, self._view = self._view, None
+        if view == self._view_sent: return       # resized or redrawn in place
+        self._view_sent = row, col, rows, cols = view
+        self._send({"type": "VIEW", "row": row, "col": col,
+                    "rows": rows, "cols": cols})
 
     def _update_rules(self):
         em = EMOJI_THEME[self.theme]
@@ -172,34 +220,165 @@ class ClientGUI(tk.Tk):
 
     def _click(self, r, c):
         if not self.spectator and not self.in_preview:
+            self._clicked_at[(r, c)] = time.perf_counter()
             self._send({"type": "CLICK", "row": r, "col": c})
 
+    # ────────────────── networking ───────────────────────────────────
     def _net_thread(self):
+        """
+        Reader: large raw reads, every complete message in them decoded and
+        handed to the UI as one batch. Sends go through _writer_thread.
+        """
         try:
             self.sock = socket.create_connection((HOST, PORT))
+            self.sock.sendall(ENCODERS[JSON]({"type": "JOIN", "name": NAME,
+                                              "room": ROOM,
+                                              "wire": list(WIRES)}))
         except OSError as e:
-            self.q.put({"type": "ERROR", "msg": str(e)})
+            self._deliver(({"type": "ERROR", "msg": str(e)},))
             return
-        self._send({"type": "JOIN", "name": NAME})
-        for line in self.sock.makefile("r"):
+        threading.Thread(target=self._writer_thread, daemon=True).start()
+        buf = bytearray()
+        while True:
+            try:
+                data = self.sock.recv(RECV_BYTES)
+                if not data: break
+                buf += data
+                batch = []
+                for m in split_msgs(buf):
+                    if m.get("type") == "WELCOME":   # later sends use its wire
+                        self.wire = m.get("wire", JSON)
+                    for sub in (m["msgs"] if m.get("type") == "BATCH" else (m,)):
+                        if self._count(sub) and not self._pong(sub):
+                            batch.append(sub)
+            except (ValueError, OSError):
+                break
+            if batch: self._deliver(batch)
+        self.outq.put(None)
+
+    def _writer_thread(self):
+        """Send what the UI queued; whatever piled up goes in one write."""
+        while True:
+            data = [self.outq.get()]
+            while not self.outq.empty(): data.append(self.outq.get())
+            stop = None in data
+            try:
+                self.sock.sendall(b"".join(d for d in data if d))
+            except OSError:
+                return
+            if stop: return
+
+    def _pong(self, m) -> bool:
+        """Round-trip time from a PONG (network thread); True if it was one."""
+        if m.get("type") != "PONG": return False
+        now = time.perf_counter()
+        self.rtt = rtt = now - m["t"]
+        if "clock" in m and rtt < self._best_rtt:   # tightest bound on offset
+            self._best_rtt = rtt
+            self.clock_offset = m["clock"] + rtt / 2 - time.time()
+        return True
+
+    def _ping(self):
+        self._send({"type": "PING", "t": time.perf_counter()})
+        if self.rtt is not None:
+            self.rtt_var.set(f"📶 {self.rtt * 1e3:.0f} ms")
+        self.after(PING_EVERY, self._ping)
+
+    def _count(self, m) -> bool:
+        """
+        Gap detection (network thread): count messages and compare with
+        the server's SEQ; on a mismatch ask for a RESYNC snapshot. Returns
+        False for SEQ itself, which the UI never sees.
+        """
+        t = m.get("type")
+        if t == "SEQ":
+            if self.seq is not None and self.seq != m["seq"]:
+                self._send({"type": "RESYNC"})
+                self.seq = None                  # unknown until the snapshot
+            else:
+                self.seq = m["seq"]
+            return False
+        if t == "SNAPSHOT":    self.seq = None   # its SEQ follows
+        elif self.seq is not None: self.seq += 1
+        return True
+
+    def _deliver(self, msgs):
+        """Queue messages for the Tk thread and wake it (network thread)."""
+        now = time.perf_counter()
+        for m in msgs: self.q.put((now, m))
+        if not self._wake_sent:
+            self._wake_sent = True
             try:
-                self.q.put(json.loads(line.strip()))
-            except json.JSONDecodeError:
-                pass
+                self.event_generate("<<NetData>>", when="tail")
+            except (tk.TclError, RuntimeError):
+                pass                             # closing; the poll catches up
 
     def _send(self, msg):
-        try:
-            self.sock.sendall((json.dumps(msg) + "\n").encode())
-        except Exception:
-            pass
+        """Queue msg for the writer thread; never blocks the UI."""
+        self.outq.put(ENCODERS[self.wire](msg))
+
+    def _safety_poll(self):
+        if not self.q.empty(): self._pump()
+        self.after(SAFETY_POLL, self._safety_poll)
+
+    def _clock_tick(self):
+        """Count down to the round deadline without help from the server."""
+        if self.deadline is not None:
+            left = max(0, math.ceil(self.deadline - self.clock_offset
+                                    - time.time()))
+            self.time_var.set(f"⏳ {left}s")
+        self.after(CLOCK_POLL, self._clock_tick)
+
+    def _set_deadline(self, m):
+        """From BEGIN / SNAPSHOT / TIME: a server deadline, or just 'left'."""
+        if "clock" in m and self.rtt is None:    # PONGs estimate it better
+            self.clock_offset = m["clock"] - time.time()
+        if m.get("deadline"): self.deadline = m["deadline"]
+        elif "left" in m:
+            self.deadline = time.time() + self.clock_offset + m["left"]
 
     def _pump(self):
+        """
+        Handle queued messages for at most FRAME_BUDGET, then let Tk paint.
+        Within what is pending only the newest TIME and the newest SCORE per
+        player are applied; older ones would be overwritten anyway.
+        """
+        self._wake_sent = False
+        pending = self._pending
         try:
-            while True:
-                self._handle(self.q.get_nowait())
+            while True: pending.append(self.q.get_nowait())
         except queue.Empty:
             pass
-        self.after(50, self._pump)
+        latest = {}
+        for i, (_, m) in enumerate(pending):
+            key = self._coalesce_key(m)
+            if key: latest[key] = i
+
+        t0 = time.perf_counter(); deadline = t0 + FRAME_BUDGET; i = 0
+        while pending and time.perf_counter() < deadline:
+            arrived, m = pending.popleft()
+            key = self._coalesce_key(m)
+            if key and latest[key] != i:
+                self.coalesced += 1
+            else:
+                self._handle(m)
+                self.queue_delay.append(time.perf_counter() - arrived)
+            i += 1
+
+        if self.grid_view: self.grid_view.redraw()
+        if self._shown:
+            now = time.perf_counter()
+            self.click_to_display.extend(now - t for t in self._shown)
+            self._shown.clear()
+        if pending:                              # over budget: next frame
+            self.after(1, self._pump)
+
+    @staticmethod
+    def _coalesce_key(m):
+        t = m.get("type")
+        if t == "TIME":  return "TIME"
+        if t == "SCORE": return ("SCORE", m.get("player"))
+        return None
 
     def _handle(self, m):
         t = m.get("type")
@@ -208,24 +387,41 @@ class ClientGUI(tk.Tk):
             self.pid       = m["player"]
             self.avatar    = m.get("avatar", "🙂")
             self.spectator = m.get("spectator", False)
+            self.title(f"Treasure Grid – Room {m.get('room', ROOM)}")
+            if "clock" in m and self.rtt is None:
+                self.clock_offset = m["clock"] - time.time()
             if self.spectator:
                 self.ready_btn.config(state="disabled")
                 self.name_ent.config(state="disabled")
 
         elif t == "PLAYERS":
             self.players = {d["player"]: d for d in m["players"]}
-            if "theme" in m and m["theme"] != self.theme:
-                self.theme = m["theme"]
-                self.theme_var.set(self.theme)
-                self._update_rules()
-            self._update_players()
+            self.roster_version = m.get("version")
+            for pid in [pid for pid, _ in self.standings.top()
+                        if pid not in self.players]:
+                self.standings.remove(pid)
+            self._roster_update(m)
+
+        elif t == "PLAYERS_DIFF":
+            v = m["version"]
+            if self.roster_version is None or v <= self.roster_version:
+                return                           # the full list covers it
+            if v != self.roster_version + 1:     # missed one: ask for it all
+                self.roster_version = None
+                self._send({"type": "PLAYERS"})
+                return
+            self.roster_version = v
+            for d in m["set"]:  self.players[d["player"]] = d
+            for pid in m["gone"]:
+                self.players.pop(pid, None); self.standings.remove(pid)
+            self._roster_update(m)
 
         elif t == "CHAT":
             self._add_chat(f"{m.get('avatar', '💬')} {m.get('name')}: {m.get('msg')}")
 
         elif t == "START":
             self.in_preview = True
-            size, layout = m["size"], m["layout"]
+            size, layout = m["size"], m.get("layout")
             self.theme = m.get("theme", self.theme)
             self.theme_var.set(self.theme)
             self._update_rules()
@@ -233,35 +429,66 @@ class ClientGUI(tk.Tk):
                 self.lobby.destroy()
                 self._build_grid(size)
                 self.current_view = "game"
+            if layout is not None:               # else CHUNKs follow
+                mapping = EMOJI_THEME[self.theme]
+                self.grid_view.fill(bg="#333", texts=[
+                    mapping[v] for row in layout for v in row])
+
+        elif t == "SNAPSHOT":                   # joined or resynced mid-round
+            self.in_preview = False
+            size = m["size"]
+            if m.get("theme", self.theme) != self.theme:
+                self.theme = m["theme"]
+                self.theme_var.set(self.theme)
+                self._update_rules()
+            if self.current_view == "lobby":
+                self.lobby.destroy()
+                self._build_grid(size)
+                self.current_view = "game"
+            self.grid_view.fill()
             mapping = EMOJI_THEME[self.theme]
-            for r in range(size):
-                for c in range(size):
-                    self.btns[r][c].config(text=mapping[layout[r][c]], bg="#333")
+            for i, st, coins in m.get("cells", ()):
+                r, c = divmod(i, size)
+                if st == 2: self.grid_view.set_cell(r, c, mapping.get(coins, "?"),
+                                                    "#222", False)
+                else:       self.grid_view.set_cell(r, c, "", "#444", False)
+            self._set_deadline(m)
+            for pid, score in m["scores"]: self.standings.set(pid, score)
+            self._show_score()
+
+        elif t == "CHUNK":
+            mapping, cell = EMOJI_THEME[self.theme], self.grid_view.set_cell
+            for dr, (vals, states) in enumerate(zip(m["coins"], m["state"])):
+                for dc, (coins, st) in enumerate(zip(vals, states)):
+                    r, c = m["row"] + dr, m["col"] + dc
+                    if m["preview"]: cell(r, c, mapping[coins], "#333")
+                    elif st == 2:    cell(r, c, mapping[coins], "#222", False)
+                    elif st == 1:    cell(r, c, "", "#444", False)
 
         elif t == "BEGIN":
-            mapping = EMOJI_THEME[self.theme]
-            for row in self.btns:
-                for b in row:
-                    b.config(text="", bg="#666")
+            self.grid_view.fill()
             self.in_preview = False
+            self._set_deadline(m)
             self._countdown(3)
 
         elif t == "TIME":
-            self.time_var.set(f"⏳ {m['left']}s")
+            self._set_deadline(m)
 
         elif t == "LOCK" and not self.in_preview:
-            r, c = m["row"], m["col"]
-            self.btns[r][c].config(bg="#444", state="disabled")
+            self.grid_view.set_cell(m["row"], m["col"], bg="#444", enabled=False)
+            clicked = self._clicked_at.pop((m["row"], m["col"]), None)
+            if clicked: self._shown.append(clicked)
 
         elif t == "REVEAL":
             r, c, coins, owner = m["row"], m["col"], m["coins"], m["player"]
             emoji = EMOJI_THEME[self.theme].get(coins, "?")
-            self.btns[r][c].config(text=emoji, bg="#222")
+            self.grid_view.set_cell(r, c, emoji, "#222", False)
             if owner == self.pid:
                 self.message_var.set(random.choice(REACTIONS.get(coins, ["..."])))
 
-        elif t == "SCORE" and m["player"] == self.pid:
-            self.score_var.set(f"⭐ {m['score']}")
+        elif t == "SCORE":
+            self.standings.set(m["player"], m["score"])
+            self._show_score()
 
         elif t == "GAMEOVER":
             self._show_gameover(m["leaderboard"], m["winners"])
@@ -276,6 +503,22 @@ class ClientGUI(tk.Tk):
         self.chat_text.see("end")
         self.chat_text.config(state="disabled")
 
+    def _roster_update(self, m):
+        if "theme" in m and m["theme"] != self.theme:
+            self.theme = m["theme"]
+            self.theme_var.set(self.theme)
+            self._update_rules()
+        for pid, d in self.players.items():      # everyone playing is ranked
+            if not d.get("spectate") and pid not in self.standings:
+                self.standings.set(pid, 0)
+        self._update_players()
+
+    def _show_score(self):
+        if self.pid not in self.standings: return
+        self.score_var.set(f"⭐ {self.standings.score(self.pid)}   "
+                           f"🏅 {self.standings.rank(self.pid)}"
+                           f"/{len(self.standings)}")
+
     def _update_players(self):
         lbl = ", ".join(f"{d['avatar']} {d['name']}{' ✔' if d['ready'] else ''}" +
                         (" (\\👀)" if d.get('spectate') else "")
@@ -301,6 +544,14 @@ class ClientGUI(tk.Tk):
         self._close()
 
     def _close(self):
+        if self.grid_view and self.grid_view.frame_times:
+            print(f"[CLIENT] grid frame times (ms): {self.grid_view.stats()}")
+        if self.queue_delay:
+            print(f"[CLIENT] click → display (ms): "
+                  f"{percentiles(self.click_to_display)}, "
+                  f"arrival → handled (ms): {percentiles(self.queue_delay)}, "
+                  f"coalesced updates: {self.coalesced}")
+        self.outq.put(None)
         try:
             self.sock.close()
         except Exception:
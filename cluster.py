@@ -0,0 +1,217 @@
+"""
+Treasure Grid – multi-process cluster
+─────────────────────────────────────
+`python server.py [port] --workers N` runs a front process that owns the
+listening socket and N worker processes that each run a full server
+(threaded or --asyncio) without listening.
+
+• The front peeks at each connection's first line (the JOIN) without
+  consuming it, looks up which worker hosts that room, and passes the file
+  descriptor over a Unix socket (SCM_RIGHTS). The worker serves it as if
+  it had accepted it itself.
+• Workers report their live rooms and connections every LOAD_INTERVAL
+  seconds. A room is pinned to one worker while it is alive; a new room
+  goes to the least-loaded worker.
+
+SO_REUSEPORT alone would spread connections, but not keep every player of
+a room on the same worker, so the front does the placement instead.
+"""
+
+import json
+import multiprocessing
+import os
+import selectors
+import socket
+import threading
+import time
+from array import array
+
+from room import DEFAULT_ROOM
+
+# ─────────────────── configuration ───────────────────────────────────
+LOAD_INTERVAL = 1.0      # seconds between worker load reports
+JOIN_TIMEOUT  = 5.0      # a silent connection goes to the default room
+MAX_PEEK      = 4096     # bytes of the first line the front looks at
+PIN_GRACE     = 5.0      # keep a new room's placement until it is reported
+
+
+# ────────────────── fd passing ───────────────────────────────────────
+def _send_fd(chan: socket.socket, fd: int):
+    chan.sendmsg([b"F"], [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                           array("i", [fd]))])
+
+
+def _recv_fd(chan: socket.socket):
+    """Next descriptor from the front, or None once the channel closes."""
+    msg, anc, _, _ = chan.recvmsg(1, socket.CMSG_LEN(array("i").itemsize))
+    if not msg: return None
+    for level, kind, data in anc:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            return array("i", data[:array("i").itemsize])[0]
+    return None
+
+
+# ────────────────── worker process ───────────────────────────────────
+def _worker_main(index: int, chan: socket.socket, inherited: list, reports,
+                 kwargs: dict, use_asyncio: bool, stats=(None, None)):
+    # drop the front's ends of every channel inherited through fork, so this
+    # worker sees EOF (and exits) as soon as the front goes away
+    for other in inherited: other.close()
+    if use_asyncio:
+        from aio_server import AsyncTreasureServer as cls
+    else:
+        from server import TreasureServer as cls
+    srv = cls(**kwargs)
+    stats_port, stats_every = stats
+    if stats_port or stats_every:
+        srv.start_stats(stats_port and stats_port + index, stats_every)
+
+    def receive():
+        srv.ready.wait()
+        while True:
+            fd = _recv_fd(chan)
+            if fd is None: os._exit(0)           # front went away
+            srv.adopt(socket.socket(fileno=fd))
+
+    def report():
+        while True:
+            reports.put({"worker": index, "pid": os.getpid(), **srv.load()})
+            time.sleep(LOAD_INTERVAL)
+
+    threading.Thread(target=receive, daemon=True).start()
+    threading.Thread(target=report, daemon=True).start()
+    print(f"[WORKER {index}] pid {os.getpid()} ready")
+    srv.serve_forever(listen=False)
+
+
+# =====================================================================
+class Front:
+    """Accepts connections and places each room on one worker process."""
+    def __init__(self, workers: int, server_kwargs: dict,
+                 use_asyncio: bool = False, stats=(None, None)):
+        self.kwargs    = server_kwargs
+        self.host      = server_kwargs.get("host", "0.0.0.0")
+        self.port      = server_kwargs["port"]
+        self.channels  = []                      # worker → fd channel
+        self.loads     = [{"rooms": [], "players": 0} for _ in range(workers)]
+        self.handed    = [0] * workers           # sent since last report
+        self.placement = {}                      # room id → (worker, since)
+        self.lock      = threading.Lock()        # loads, handed, placement
+        self.reports   = multiprocessing.Queue()
+        self.procs     = []
+        for i in range(workers):
+            front_end, worker_end = socket.socketpair(socket.AF_UNIX,
+                                                      socket.SOCK_STREAM)
+            p = multiprocessing.Process(
+                target=_worker_main, daemon=True,
+                args=(i, worker_end, self.channels + [front_end],
+                      self.reports, server_kwargs, use_asyncio, stats))
+            p.start()
+            worker_end.close()
+            self.channels.append(front_end)
+            self.procs.append(p)
+
+    # ────────────────── load tracking ────────────────────────────────
+    def _collect_reports(self):
+        last = None
+        while True:
+            r = self.reports.get()
+            with self.lock:
+                self.loads[r["worker"]] = r
+                self.handed[r["worker"]] = 0
+                summary = [(len(l["rooms"]), l["players"]) for l in self.loads]
+            if summary != last:
+                print("[FRONT] load (rooms, players) per worker: "
+                      + ", ".join(f"w{i}={s}" for i, s in enumerate(summary)))
+                last = summary
+
+    def _place(self, room_id: str) -> int:
+        """Worker for room_id: where it already lives, else the least loaded."""
+        now = time.monotonic()
+        with self.lock:
+            pinned = self.placement.get(room_id)
+            if pinned:
+                w, since = pinned
+                if room_id in self.loads[w]["rooms"] or now - since < PIN_GRACE:
+                    self.handed[w] += 1
+                    return w
+            w = min(range(len(self.loads)),
+                    key=lambda i: (self.loads[i]["players"] + self.handed[i],
+                                   len(self.loads[i]["rooms"])))
+            self.placement[room_id] = (w, now)
+            self.handed[w] += 1
+            # forget rooms that no worker reports any more
+            live = {rid for l in self.loads for rid in l["rooms"]}
+            for rid, (_, since) in list(self.placement.items()):
+                if rid not in live and now - since >= PIN_GRACE:
+                    del self.placement[rid]
+            return w
+
+    # ────────────────── hand-off ─────────────────────────────────────
+    @staticmethod
+    def _room_of(peeked: bytes) -> str:
+        line = peeked.split(b"\n", 1)[0]
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return DEFAULT_ROOM
+        if isinstance(msg, dict) and msg.get("type") == "JOIN":
+            return str(msg.get("room") or DEFAULT_ROOM)
+        return DEFAULT_ROOM
+
+    def _hand_off(self, conn: socket.socket, peeked: bytes):
+        w = self._place(self._room_of(peeked))
+        try:
+            _send_fd(self.channels[w], conn.fileno())
+        except OSError as e:
+            print(f"[FRONT] worker {w} unreachable: {e}")
+        conn.close()                             # the worker has its own copy
+
+    # ────────────────── main loop ────────────────────────────────────
+    def serve_forever(self):
+        threading.Thread(target=self._collect_reports, daemon=True).start()
+        sel, pending = selectors.DefaultSelector(), {}   # conn → deadline
+        parked = {}          # conn → recheck time (half a line peeked so far)
+        with socket.create_server((self.host, self.port)) as s:
+            s.setblocking(False)
+            sel.register(s, selectors.EVENT_READ)
+            print(f"[FRONT] Listening on {self.port} with "
+                  f"{len(self.procs)} workers …")
+            while True:
+                for key, _ in sel.select(timeout=0.02 if parked else 0.5):
+                    if key.fileobj is s:
+                        try:
+                            conn, _ = s.accept()
+                        except OSError:
+                            continue
+                        conn.setblocking(False)
+                        pending[conn] = time.monotonic() + JOIN_TIMEOUT
+                        sel.register(conn, selectors.EVENT_READ)
+                        continue
+                    conn = key.fileobj
+                    try:
+                        peeked = conn.recv(MAX_PEEK, socket.MSG_PEEK)
+                    except OSError:
+                        peeked = b""
+                    sel.unregister(conn)
+                    if b"\n" in peeked or len(peeked) >= MAX_PEEK or not peeked:
+                        del pending[conn]
+                        if peeked:
+                            conn.setblocking(True)
+                            self._hand_off(conn, peeked)
+                        else:
+                            conn.close()         # gone before saying hello
+                    else:
+                        # peeked data stays readable; poll again shortly
+                        # instead of spinning on it
+                        parked[conn] = time.monotonic() + 0.02
+                now = time.monotonic()
+                for conn in [c for c, t in parked.items() if t < now]:
+                    del parked[conn]
+                    sel.register(conn, selectors.EVENT_READ)
+                for conn in [c for c, t in pending.items() if t < now]:
+                    if conn in parked: del parked[conn]
+                    else:              sel.unregister(conn)
+                    del pending[conn]
+                    conn.setblocking(True)
+                    self._hand_off(conn, b"")
@@ -0,0 +1,145 @@
+"""
+Treasure Grid – round event log
+───────────────────────────────
+Append-only binary record of one room: joins / leaves, names, the seeded
+board, BEGIN, every LOCK / REVEAL / SCORE and the end of the round. Writes go
+through a 64 KiB buffer and are only flushed when the room closes (or the
+buffer fills), so logging a click costs one struct.pack and a memcpy.
+
+File layout (little-endian):
+
+    header   b"TGL1" + <d wall-clock start time>
+    record   <B kind> <I milliseconds since start> <body>
+
+    JOIN     <I pid>                       LEAVE  <I pid>
+    NAME     <I pid> <H len> utf-8         BEGIN  –
+    START    <I size> <Q seed> <H len> theme, then size² signed coin bytes
+    LOCK     <H row> <H col> <I pid>       END    –
+    REVEAL   <H row> <H col> <I pid> <b coins>
+    SCORE    <I pid> <i score>
+
+read_events(path) yields (ms, kind, fields) tuples; replay.py re-runs them.
+"""
+
+import itertools
+import os
+import re
+import struct
+import threading
+import time
+
+MAGIC  = b"TGL1"
+BUFFER = 64 * 1024
+
+_serial = itertools.count(1)             # keeps same-second file names apart
+
+JOIN, LEAVE, NAME, START, BEGIN, LOCK, REVEAL, SCORE, END = range(1, 10)
+KINDS = {JOIN: "JOIN", LEAVE: "LEAVE", NAME: "NAME", START: "START",
+         BEGIN: "BEGIN", LOCK: "LOCK", REVEAL: "REVEAL", SCORE: "SCORE",
+         END: "END"}
+
+_HEAD    = struct.Struct("<BI")
+_HEADER  = struct.Struct("<d")
+_PID     = struct.Struct("<I")
+_TEXT    = struct.Struct("<IH")
+_START   = struct.Struct("<IQH")
+_LOCK    = struct.Struct("<HHI")
+_REVEAL  = struct.Struct("<HHIb")
+_SCORE   = struct.Struct("<Ii")
+_BODIES  = {JOIN: _PID, LEAVE: _PID, LOCK: _LOCK, REVEAL: _REVEAL,
+            SCORE: _SCORE}
+
+
+def _text(s: str) -> bytes:
+    """s as UTF-8, cut to fit a u16 length without splitting a character."""
+    raw = s.encode()
+    if len(raw) > 0xFFFF:
+        raw = raw[:0xFFFF].decode(errors="ignore").encode()
+    return raw
+
+
+class EventLog:
+    """Buffered, thread-safe writer for one room's log file."""
+    def __init__(self, path: str):
+        self.path    = path
+        self.records = 0
+        self._t0     = time.monotonic()
+        self._lock   = threading.Lock()
+        self._f      = open(path, "ab", buffering=BUFFER)
+        self._f.write(MAGIC + _HEADER.pack(time.time()))
+
+    @classmethod
+    def for_room(cls, directory: str, room_id: str) -> "EventLog":
+        """A new log in directory, named after the room and the wall clock."""
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", room_id)[:64] or "room"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{safe}-{stamp}-{os.getpid()}-"
+                                       f"{next(_serial)}.tglog")
+        return cls(path)
+
+    # ────────────────── records ──────────────────────────────────────
+    def _write(self, kind: int, body: bytes = b""):
+        ms = int((time.monotonic() - self._t0) * 1000)
+        with self._lock:
+            if self._f.closed: return
+            self._f.write(_HEAD.pack(kind, ms) + body)
+            self.records += 1
+
+    def join(self, pid: int):                  self._write(JOIN, _PID.pack(pid))
+    def leave(self, pid: int):                 self._write(LEAVE, _PID.pack(pid))
+    def begin(self):                           self._write(BEGIN)
+    def end(self):                             self._write(END)
+    def lock(self, r: int, c: int, pid: int):  self._write(LOCK, _LOCK.pack(r, c, pid))
+    def score(self, pid: int, score: int):     self._write(SCORE, _SCORE.pack(pid, score))
+
+    def reveal(self, r: int, c: int, pid: int, coins: int):
+        self._write(REVEAL, _REVEAL.pack(r, c, pid, coins))
+
+    def name(self, pid: int, name: str):
+        raw = _text(str(name))
+        self._write(NAME, _TEXT.pack(pid, len(raw)) + raw)
+
+    def start(self, board, theme: str):
+        raw = _text(theme)
+        self._write(START, _START.pack(board.size, board.seed, len(raw))
+                    + raw + board.coins_bytes())
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed: self._f.close()
+
+
+# ────────────────── reading ──────────────────────────────────────────
+def read_events(path: str):
+    """
+    Yield (ms, kind, fields) for every record; fields is a tuple, except
+    START → (size, seed, theme, coins bytes). A truncated tail is ignored.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path}: not a Treasure Grid event log")
+    pos, end = 4 + _HEADER.size, len(data)
+    while pos + _HEAD.size <= end:
+        kind, ms = _HEAD.unpack_from(data, pos); pos += _HEAD.size
+        body = _BODIES.get(kind)
+        if body:
+            if pos + body.size > end: break
+            fields = body.unpack_from(data, pos); pos += body.size
+        elif kind == NAME:
+            if pos + _TEXT.size > end: break
+            pid, n = _TEXT.unpack_from(data, pos); pos += _TEXT.size
+            fields = (pid, data[pos:pos + n].decode(errors="replace")); pos += n
+        elif kind == START:
+            if pos + _START.size > end: break
+            size, seed, n = _START.unpack_from(data, pos); pos += _START.size
+            theme = data[pos:pos + n].decode(errors="replace"); pos += n
+            coins = data[pos:pos + size * size]; pos += size * size
+            if len(coins) < size * size: break
+            fields = (size, seed, theme, coins)
+        elif kind in (BEGIN, END):
+            fields = ()
+        else:
+            raise ValueError(f"{path}: unknown record kind {kind} at {pos}")
+        yield ms, kind, fields
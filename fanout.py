@@ -0,0 +1,144 @@
+"""
+Treasure Grid – outbound fan-out
+────────────────────────────────
+Each connection gets an Outbox: a bounded queue drained by its own writer
+thread. Broadcasts are encoded once and the same bytes object is queued for
+every client, so one stalled socket never blocks the thread that produced an
+event (or anyone holding the server lock).
+
+A client is evicted once its unsent backlog would exceed max_backlog bytes
+while its writer has been stuck in one send for STALL_SECONDS (the peer is
+not reading), or once the backlog reaches HARD_LIMIT × max_backlog no matter
+what. Eviction shuts the socket down, which ends the reader thread and runs
+the normal disconnect path.
+"""
+
+import collections
+import socket
+import threading
+import time
+
+STALL_SECONDS = 1.0     # a send blocked this long means the peer stopped reading
+HARD_LIMIT    = 4       # × max_backlog: evict even if the writer is moving
+
+
+class Outbox:
+    """Bounded per-connection send queue with a dedicated writer thread."""
+    def __init__(self, sock: socket.socket, max_backlog: int, name: str = ""):
+        self.sock        = sock
+        self.max_backlog = max_backlog
+        self.queued      = 0                     # bytes waiting to be sent
+        self.sent        = 0                     # bytes handed to the kernel
+        self.closed      = False
+        self.evicted     = False
+        self._hangup     = False                 # shut down once drained
+        self._busy_since = 0.0                   # start of the current send
+        self._q          = collections.deque()
+        self._cond       = threading.Condition()
+        threading.Thread(target=self._drain, name=f"writer-{name}",
+                         daemon=True).start()
+
+    # ────────────────── producer side ────────────────────────────────
+    def put(self, data: bytes) -> bool:
+        """Queue data for sending. Returns False if the client was dropped."""
+        with self._cond:
+            if self.closed: return False
+            backlog = self.queued + len(data)
+            if self._q and backlog > self.max_backlog and (
+                    backlog > HARD_LIMIT * self.max_backlog or self._stalled()):
+                self._evict()
+                return False
+            self._q.append(data)
+            self.queued += len(data)
+            self._cond.notify()
+        return True
+
+    @property
+    def depth(self) -> int:
+        return len(self._q)
+
+    def close(self, hangup: bool = False):
+        """
+        Stop accepting data. Whatever is queued is still sent; with hangup
+        the socket is shut down afterwards, ending the peer's connection.
+        """
+        with self._cond:
+            self.closed  = True
+            self._hangup = self._hangup or hangup
+            self._cond.notify()
+
+    # ────────────────── writer thread ────────────────────────────────
+    def _drain(self):
+        while True:
+            with self._cond:
+                while not self._q and not self.closed:
+                    self._cond.wait()
+                if not self._q:
+                    if self._hangup: self._shutdown()
+                    return
+                # everything queued so far goes out in one syscall
+                chunks = list(self._q); self._q.clear()
+                size, self.queued = self.queued, 0
+            self._busy_since = time.monotonic()
+            try:
+                self.sock.sendall(chunks[0] if len(chunks) == 1
+                                  else b"".join(chunks))
+                self.sent += size
+            except OSError:
+                self.close()
+                return
+            finally:
+                self._busy_since = 0.0
+
+    def _stalled(self) -> bool:
+        since = self._busy_since
+        return bool(since) and time.monotonic() - since > STALL_SECONDS
+
+    def _evict(self):
+        # caller holds self._cond
+        self.closed = self.evicted = True
+        self._q.clear(); self.queued = 0
+        self._cond.notify()
+        self._shutdown()
+
+    def _shutdown(self):
+        try: self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+
+
+class Batcher:
+    """
+    Coalesces broadcasts: everything produced within `window` seconds of the
+    first pending message goes out as one BATCH frame (a lone message is sent
+    as-is). `schedule(delay, fn)` arms the flush; `emit(msg)` fans a frame out.
+    A message added with `to` (a set of client ids, taken when it is added)
+    is meant for those clients only; a flush holding any goes to
+    `emit_scoped(msgs, scoped)` instead, with (index, to) for each of them.
+    Not thread-safe: a room calls it from its single writer only.
+    """
+    def __init__(self, window: float, schedule, emit, emit_scoped=None):
+        self.window       = window
+        self._schedule    = schedule
+        self._emit        = emit
+        self._emit_scoped = emit_scoped
+        self._msgs        = []
+        self._scoped      = []                   # (index into _msgs, to)
+        self.frames       = 0                    # flushes emitted
+        self.messages     = 0                    # messages carried by them
+
+    def add(self, msg: dict, to: set = None):
+        if to is not None: self._scoped.append((len(self._msgs), to))
+        self._msgs.append(msg)
+        if len(self._msgs) == 1: self._schedule(self.window, self.flush)
+
+    def flush(self):
+        msgs, self._msgs = self._msgs, []
+        if not msgs: return
+        self.frames   += 1
+        self.messages += len(msgs)
+        if self._scoped:
+            scoped, self._scoped = self._scoped, []
+            self._emit_scoped(msgs, scoped)
+        else:
+            self._emit(msgs[0] if len(msgs) == 1
+                       else {"type": "BATCH", "msgs": msgs})
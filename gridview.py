@@ -0,0 +1,236 @@
+"""
+Treasure Grid – canvas grid renderer
+────────────────────────────────────
+GridCanvas draws the board on one tk.Canvas instead of a tk.Button per
+cell:
+
+• The cell model (text, colour, clickable) lives in flat lists; set_cell()
+  only marks a cell dirty, and one idle callback redraws the dirty cells
+  that are on screen.
+• Only the visible cells have canvas items. Scrolling or zooming creates the
+  newly exposed ones and drops the rest, so a 1000×1000 board costs what the
+  window shows.
+• Clicks are hit-tested from canvas coordinates; the wheel scrolls,
+  Ctrl+wheel (or +/-) zooms, and on_view(row, col, rows, cols) reports the
+  visible region (for VIEW subscriptions).
+• Every redraw is timed; stats() gives frame-time percentiles.
+
+    python gridview.py 50        # build + full-repaint timings, Buttons vs Canvas
+"""
+
+import collections
+import sys
+import time
+import tkinter as tk
+
+from metrics import percentiles
+
+HIDDEN_BG = "#666"
+MIN_CELL, MAX_CELL = 12, 72      # zoom limits, pixels per cell
+
+
+class GridCanvas(tk.Frame):
+    def __init__(self, master, size: int, on_click=None, on_view=None,
+                 cell: int = None, **kw):
+        super().__init__(master, bg="#222", **kw)
+        self.cells     = size                    # per side (Misc.size is taken)
+        self.cell      = cell or max(MIN_CELL, min(48, 520 // max(size, 1)))
+        self.on_click  = on_click
+        self.on_view   = on_view
+        n = size * size
+        self.texts     = [""] * n
+        self.colors    = [HIDDEN_BG] * n
+        self.enabled   = bytearray(b"\x01") * n   # clickable
+        self.frame_times = collections.deque(maxlen=2000)   # seconds
+        self._items    = {}                      # cell index → (rect, text)
+        self._dirty    = set()
+        self._queued   = False
+        self._shown    = (0, 0, 0, 0)            # r0, c0, r1, c1 on screen
+
+        side = size * self.cell
+        self.canvas = tk.Canvas(self, bg="#222", highlightthickness=0,
+                                width=min(side, 560), height=min(side, 520))
+        xs = tk.Scrollbar(self, orient="horizontal", command=self._xview)
+        ys = tk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.config(xscrollcommand=xs.set, yscrollcommand=ys.set)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        ys.grid(row=0, column=1, sticky="ns")
+        xs.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1); self.columnconfigure(0, weight=1)
+        self._set_region()
+
+        c = self.canvas
+        c.bind("<Button-1>", self._clicked)
+        c.bind("<Configure>", lambda e: self._moved())
+        c.bind("<MouseWheel>", self._wheel)                       # Win / macOS
+        c.bind("<Button-4>", lambda e: self._wheel(e, +1))        # X11
+        c.bind("<Button-5>", lambda e: self._wheel(e, -1))
+        c.bind("<Control-Button-4>", lambda e: self.zoom(1.25))
+        c.bind("<Control-Button-5>", lambda e: self.zoom(0.8))
+        c.bind("<plus>",  lambda e: self.zoom(1.25))
+        c.bind("<minus>", lambda e: self.zoom(0.8))
+
+    # ────────────────── model ────────────────────────────────────────
+    def set_cell(self, r: int, c: int, text: str = None, bg: str = None,
+                 enabled: bool = None):
+        i = r * self.cells + c
+        if text is not None:    self.texts[i] = text
+        if bg is not None:      self.colors[i] = bg
+        if enabled is not None: self.enabled[i] = enabled
+        self._dirty.add(i)
+        self._schedule()
+
+    def fill(self, text: str = "", bg: str = HIDDEN_BG, enabled: bool = True,
+             texts: list = None):
+        """Reset every cell (texts: one per cell, row-major); redraws only
+        what is on screen."""
+        n = self.cells * self.cells
+        self.texts  = list(texts) if texts is not None else [text] * n
+        self.colors = [bg] * n
+        self.enabled = bytearray([enabled]) * n
+        self._dirty = set(self._items)
+        self._schedule()
+
+    # ────────────────── drawing ──────────────────────────────────────
+    def _schedule(self):
+        if not self._queued:
+            self._queued = True
+            self.after_idle(self.redraw)
+
+    def redraw(self):
+        """Repaint dirty on-screen cells (one timed frame)."""
+        self._queued = False
+        if not self._dirty: return
+        t0 = time.perf_counter()
+        dirty, self._dirty = self._dirty, set()
+        items, cfg = self._items, self.canvas.itemconfigure
+        text, bg   = self.texts, self.colors
+        for i in dirty:
+            ids = items.get(i)
+            if ids:                              # off-screen cells wait
+                cfg(ids[0], fill=bg[i]); cfg(ids[1], text=text[i])
+        self.frame_times.append(time.perf_counter() - t0)
+
+    def _visible(self) -> tuple:
+        c, k = self.canvas, self.cell
+        x0, y0 = c.canvasx(0), c.canvasy(0)
+        w, h = max(c.winfo_width(), 1), max(c.winfo_height(), 1)
+        return (max(0, int(y0 // k)), max(0, int(x0 // k)),
+                min(self.cells, int((y0 + h) // k) + 1),
+                min(self.cells, int((x0 + w) // k) + 1))
+
+    def _moved(self):
+        """Create items for newly visible cells and drop the hidden ones."""
+        t0 = time.perf_counter()
+        r0, c0, r1, c1 = shown = self._visible()
+        if shown == self._shown: return
+        self._shown = shown
+        k, s, cv = self.cell, self.cells, self.canvas
+        font = ("Helvetica", max(6, k // 3), "bold")
+        for i in [i for i in self._items
+                  if not (r0 <= i // s < r1 and c0 <= i % s < c1)]:
+            for item in self._items.pop(i): cv.delete(item)
+        for r in range(r0, r1):
+            for c in range(c0, c1):
+                i = r * s + c
+                if i in self._items: continue
+                x, y = c * k, r * k
+                self._items[i] = (
+                    cv.create_rectangle(x + 1, y + 1, x + k - 1, y + k - 1,
+                                        fill=self.colors[i], width=0),
+                    cv.create_text(x + k / 2, y + k / 2, text=self.texts[i],
+                                   fill="white", font=font))
+        self.frame_times.append(time.perf_counter() - t0)
+        if self.on_view: self.on_view(r0, c0, r1 - r0, c1 - c0)
+
+    def _set_region(self):
+        side = self.cells * self.cell
+        self.canvas.config(scrollregion=(0, 0, side, side),
+                           xscrollincrement=self.cell,
+                           yscrollincrement=self.cell)
+
+    # ────────────────── input ────────────────────────────────────────
+    def cell_at(self, x: int, y: int):
+        """(row, col) under widget coordinates x, y, or None."""
+        r = int(self.canvas.canvasy(y) // self.cell)
+        c = int(self.canvas.canvasx(x) // self.cell)
+        if 0 <= r < self.cells and 0 <= c < self.cells: return r, c
+        return None
+
+    def _clicked(self, e):
+        self.canvas.focus_set()                  # for the +/- zoom keys
+        hit = self.cell_at(e.x, e.y)
+        if hit and self.enabled[hit[0] * self.cells + hit[1]] and self.on_click:
+            self.on_click(*hit)
+
+    def _xview(self, *args):
+        self.canvas.xview(*args); self._moved()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args); self._moved()
+
+    def _wheel(self, e, direction: int = 0):
+        step = direction or (1 if e.delta > 0 else -1)
+        if e.state & 0x4:                        # Control held: zoom
+            return self.zoom(1.25 if step > 0 else 0.8)
+        if e.state & 0x1: self._xview("scroll", -step, "units")
+        else:             self._yview("scroll", -step, "units")
+
+    def zoom(self, factor: float):
+        cell = max(MIN_CELL, min(MAX_CELL, int(self.cell * factor)))
+        if cell == self.cell: return
+        r0, c0, r1, c1 = self._visible()
+        self.cell = cell
+        self.canvas.delete("all"); self._items.clear()
+        self._shown = (0, 0, 0, 0)
+        self._set_region()
+        side = self.cells * cell                 # keep the centre in place
+        self.canvas.xview_moveto(max(0, (c0 + c1) / 2 * cell
+                                     - self.canvas.winfo_width() / 2) / side)
+        self.canvas.yview_moveto(max(0, (r0 + r1) / 2 * cell
+                                     - self.canvas.winfo_height() / 2) / side)
+        self._moved()
+
+    # ────────────────── measurement ──────────────────────────────────
+    def stats(self) -> dict:
+        """Frame-time percentiles in milliseconds."""
+        return percentiles(self.frame_times, (50, 99))
+
+
+# ────────────────── before / after timing ────────────────────────────
+def _compare(size: int):
+    """Build + one full repaint: the old Button grid vs GridCanvas."""
+    root = tk.Tk(); root.geometry("700x700")
+
+    t0 = time.perf_counter()
+    frame = tk.Frame(root); frame.pack()
+    btns = [[tk.Button(frame, width=3, height=2, bg=HIDDEN_BG, relief="flat")
+             for _ in range(size)] for _ in range(size)]
+    for r, row in enumerate(btns):
+        for c, b in enumerate(row): b.grid(row=r, column=c, padx=1, pady=1)
+    root.update()
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for row in btns:
+        for b in row: b.config(text="🥇", bg="#333")
+    root.update()
+    paint = time.perf_counter() - t0
+    frame.destroy()
+    print(f"buttons  size {size}: build {build * 1e3:8.1f} ms   "
+          f"repaint {paint * 1e3:8.1f} ms")
+
+    t0 = time.perf_counter()
+    grid = GridCanvas(root, size); grid.pack(expand=True, fill="both")
+    root.update()
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    grid.fill("🥇", "#333"); grid.redraw(); root.update()
+    paint = time.perf_counter() - t0
+    print(f"canvas   size {size}: build {build * 1e3:8.1f} ms   "
+          f"repaint {paint * 1e3:8.1f} ms   frames {grid.stats()}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    for n in (sys.argv[1:] or ["10", "50"]):
+        _compare(int(n))
@@ -0,0 +1,206 @@
+"""
+Treasure Grid – load generator
+──────────────────────────────
+Spawns BotClients against a running server and reports capacity numbers:
+
+• connection setup time (connect → WELCOME)
+• click → LOCK and click → REVEAL latency percentiles for each bot's own
+  clicks (REVEAL includes the room's REVEAL_DELAY by design)
+• messages per second received across all bots
+
+    python server.py 6000 &
+    python loadgen.py --port 6000 --rooms 4 --clickers 8 --spectators 50
+
+Bots per room: `--clickers` random clickers and `--chatters` chatters ready
+up and play; `--spectators` join once the round has started. With
+`--view N` each spectator subscribes to a random N×N viewport instead of
+the whole board (run the server with a large --board-size).
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from bot import BotClient
+from metrics import percentiles
+from room import REVEAL_DELAY
+
+
+class LoadRun:
+    def __init__(self, args):
+        self.args      = args
+        self.lock      = threading.Lock()
+        self.rng       = random.Random(args.seed)
+        self.connects  = []                      # seconds
+        self.to_lock   = []                      # seconds
+        self.to_reveal = []                      # seconds
+        self.sent      = {}                      # (pid, r, c) → send time
+        self.clicks    = 0
+        self.chats     = 0
+        self.errors    = 0
+        self.bots      = []
+        self.began     = {}                      # room → threading.Event
+        self.started   = {}                      # room → threading.Event
+        self.over      = {}                      # room → threading.Event
+
+    # ────────────────── bots ─────────────────────────────────────────
+    def _spawn(self, room: str, name: str):
+        a = self.args
+        bot = BotClient(a.host, a.port, name=name, room=room,
+                        wires=("json",) if a.json else ("bin1", "json"))
+        try:
+            bot.connect()
+        except OSError as e:
+            with self.lock: self.errors += 1
+            print(f"[LOAD] {name}: {e}")
+            return None
+        bot.role = name.split("-")[0]
+        bot.next_action = 0.0
+        with self.lock:
+            self.connects.append(bot.connect_time)
+            self.bots.append(bot)
+        bot.start(self._on_message)
+        return bot
+
+    def _on_message(self, bot, m):
+        t, now = m.get("type"), time.perf_counter()
+        if t == "LOCK" and m["player"] == bot.pid:
+            with self.lock:
+                sent = self.sent.get((bot.pid, m["row"], m["col"]))
+                if sent: self.to_lock.append(now - sent)
+        elif t == "REVEAL" and m["player"] == bot.pid:
+            with self.lock:
+                sent = self.sent.pop((bot.pid, m["row"], m["col"]), None)
+                if sent: self.to_reveal.append(now - sent)
+        elif t == "START":
+            self.started[bot.room].set()
+        elif t == "BEGIN":
+            self.began[bot.room].set()
+        elif t == "GAMEOVER":
+            self.over[bot.room].set()
+
+    def _pick(self, bot):
+        hidden = bot.hidden
+        for _ in range(8):
+            cell = (self.rng.randrange(bot.size), self.rng.randrange(bot.size))
+            if cell in hidden: return cell
+        try:
+            return next(iter(hidden))
+        except (StopIteration, RuntimeError):
+            return None
+
+    # ────────────────── driver ───────────────────────────────────────
+    def _drive(self, deadline: float):
+        a = self.args
+        click_gap = 1 / a.click_rate if a.click_rate else None
+        chat_gap  = 1 / a.chat_rate if a.chat_rate else None
+        while time.perf_counter() < deadline:
+            if all(ev.is_set() for ev in self.over.values()): return
+            now = time.perf_counter()
+            for bot in self.bots:
+                if bot.closed or now < bot.next_action: continue
+                if not self.began[bot.room].is_set(): continue
+                if bot.role == "click" and click_gap:
+                    cell = self._pick(bot)
+                    if cell is None: continue
+                    with self.lock:
+                        self.sent[(bot.pid, *cell)] = time.perf_counter()
+                        self.clicks += 1
+                    bot.send({"type": "CLICK", "row": cell[0], "col": cell[1]})
+                    bot.next_action = now + self.rng.expovariate(1 / click_gap)
+                elif bot.role == "chat" and chat_gap:
+                    bot.send({"type": "CHAT", "msg": f"hi from {bot.name}"})
+                    with self.lock: self.chats += 1
+                    bot.next_action = now + self.rng.expovariate(1 / chat_gap)
+            time.sleep(0.002)
+
+    def run(self) -> dict:
+        a = self.args
+        rooms = [f"{a.room_prefix}{i}" for i in range(a.rooms)]
+        for room in rooms:
+            self.began[room]   = threading.Event()
+            self.started[room] = threading.Event()
+            self.over[room]    = threading.Event()
+
+        t0 = time.perf_counter()
+        for room in rooms:
+            players = ([self._spawn(room, f"click-{room}-{i}")
+                        for i in range(a.clickers)] +
+                       [self._spawn(room, f"chat-{room}-{i}")
+                        for i in range(a.chatters)])
+            for bot in filter(None, players):
+                bot.send({"type": "NAME", "name": bot.name})
+                bot.send({"type": "READY"})
+        for room in rooms:
+            if not self.started[room].wait(10):
+                print(f"[LOAD] room {room!r} never started")
+            for i in range(a.spectators):
+                bot = self._spawn(room, f"watch-{room}-{i}")
+                if bot and a.view:
+                    bot.view(self.rng.randrange(max(1, bot.size - a.view + 1)),
+                             self.rng.randrange(max(1, bot.size - a.view + 1)),
+                             a.view, a.view)
+        for room in rooms:                       # the preview is not load
+            if not self.began[room].wait(10):
+                print(f"[LOAD] room {room!r} never began")
+        setup = time.perf_counter() - t0
+
+        base = sum(b.received for b in self.bots)
+        t1 = time.perf_counter()
+        self._drive(t1 + a.duration)
+        elapsed = time.perf_counter() - t1
+        received = sum(b.received for b in self.bots) - base
+        for bot in self.bots: bot.close()
+
+        return {
+            "bots": len(self.bots), "rooms": len(rooms),
+            "setup_s": round(setup, 3),
+            "connect_ms": percentiles(self.connects),
+            "click_to_lock_ms": percentiles(self.to_lock),
+            "click_to_reveal_ms": percentiles(self.to_reveal),
+            "reveal_delay_ms": REVEAL_DELAY * 1e3,
+            "clicks": self.clicks, "reveals": len(self.to_reveal),
+            "chats": self.chats, "errors": self.errors,
+            "resyncs": sum(b.resyncs for b in self.bots),
+            "elapsed_s": round(elapsed, 3),
+            "msgs_per_s": round(received / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+# =====================================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treasure Grid load generator")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6000)
+    ap.add_argument("--rooms", type=int, default=1)
+    ap.add_argument("--room-prefix", default="load-")
+    ap.add_argument("--clickers", type=int, default=4, help="per room")
+    ap.add_argument("--chatters", type=int, default=0, help="per room")
+    ap.add_argument("--spectators", type=int, default=0, help="per room")
+    ap.add_argument("--view", type=int, default=0, metavar="N",
+                    help="spectators watch a random N×N viewport (default: all)")
+    ap.add_argument("--click-rate", type=float, default=10,
+                    help="clicks per second per clicker")
+    ap.add_argument("--chat-rate", type=float, default=1,
+                    help="chat lines per second per chatter")
+    ap.add_argument("--duration", type=float, default=20,
+                    help="seconds to drive load after the rounds begin")
+    ap.add_argument("--json", action="store_true",
+                    help="offer only the JSON wire format")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", metavar="FILE",
+                    help="also write the report as JSON")
+    args = ap.parse_args(argv)
+
+    report = LoadRun(args).run()
+    for k, v in report.items():
+        print(f"{k:>20}: {v}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
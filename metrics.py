@@ -0,0 +1,167 @@
+"""
+Treasure Grid – metrics
+───────────────────────
+Counters and latency histograms for the server's hot paths, plus a small
+stats endpoint. Sampling is off by default: every probe is guarded by the
+module-level `enabled` flag, so the cost when off is one global lookup.
+
+    metrics.enable()
+    metrics.count("in.CLICK")
+    metrics.observe("fanout.seconds", dt)
+    metrics.add_collector(lambda: {"rooms": len(server.rooms)})
+    metrics.serve(9100)                 # GET http://127.0.0.1:9100/[json]
+    metrics.dump_every(10)              # print a snapshot every 10 s
+"""
+
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+enabled = False
+
+# histogram bucket upper bounds in seconds: 1 µs … ~8 s, doubling
+_BOUNDS = [1e-6 * 2 ** i for i in range(24)]
+
+
+class Histogram:
+    """Log-bucketed distribution; percentiles are bucket upper bounds."""
+    __slots__ = ("buckets", "count", "total", "max", "_lock")
+
+    def __init__(self):
+        self.buckets = [0] * (len(_BOUNDS) + 1)
+        self.count, self.total, self.max = 0, 0.0, 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float):
+        with self._lock:
+            self.buckets[bisect.bisect_left(_BOUNDS, v)] += 1
+            self.count += 1
+            self.total += v
+            if v > self.max: self.max = v
+
+    def percentile(self, q: float) -> float:
+        want, seen = self.count * q / 100, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= want:
+                return min(_BOUNDS[i], self.max) if i < len(_BOUNDS) else self.max
+        return 0.0
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "sum": round(self.total, 6),
+                "p50": self.percentile(50), "p90": self.percentile(90),
+                "p99": self.percentile(99), "max": self.max}
+
+
+def percentiles(values, qs=(50, 90, 99)) -> dict:
+    """Exact {"n", "p50", …, "max"} of raw samples, in milliseconds."""
+    if not values: return {}
+    v = sorted(values)
+    out = {"n": len(v)}
+    out.update({f"p{q}": round(v[min(len(v) - 1, int(len(v) * q / 100))] * 1e3, 2)
+                for q in qs})
+    out["max"] = round(v[-1] * 1e3, 2)
+    return out
+
+
+_counters   = {}
+_histograms = {}
+_collectors = []
+_lock       = threading.Lock()
+
+
+# ────────────────── probes ───────────────────────────────────────────
+def enable(on: bool = True):
+    global enabled
+    enabled = on
+
+
+def count(name: str, n: int = 1):
+    if not enabled: return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name: str, seconds: float):
+    if not enabled: return
+    h = _histograms.get(name)
+    if h is None:
+        with _lock:
+            h = _histograms.setdefault(name, Histogram())
+    h.observe(seconds)
+
+
+def add_collector(fn):
+    """fn() → {name: number} of gauges read at snapshot time."""
+    _collectors.append(fn)
+
+
+def reset():
+    with _lock:
+        _counters.clear(); _histograms.clear()
+
+
+# ────────────────── reporting ────────────────────────────────────────
+def snapshot() -> dict:
+    gauges = {}
+    for fn in _collectors:
+        try:
+            gauges.update(fn())
+        except Exception as e:                   # never break the endpoint
+            gauges[f"collector_error.{fn.__name__}"] = repr(e)
+    with _lock:
+        counters = dict(_counters)
+        hists    = {k: h.snapshot() for k, h in _histograms.items()}
+    return {"time": time.time(), "enabled": enabled, "counters": counters,
+            "histograms": hists, "gauges": gauges}
+
+
+def render(snap: dict = None) -> str:
+    snap = snap or snapshot()
+    lines = [f"# treasure-grid stats (sampling {'on' if snap['enabled'] else 'off'})"]
+    for k, v in sorted(snap["counters"].items()):
+        lines.append(f"counter {k} {v}")
+    for k, h in sorted(snap["histograms"].items()):
+        lines.append(f"hist {k} count={h['count']} sum={h['sum']:.6f} "
+                     f"p50={h['p50']:.6f} p90={h['p90']:.6f} "
+                     f"p99={h['p99']:.6f} max={h['max']:.6f}")
+    for k, v in sorted(snap["gauges"].items()):
+        lines.append(f"gauge {k} {v}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        snap = snapshot()
+        if self.path.rstrip("/").endswith("json"):
+            body, ctype = json.dumps(snap).encode(), "application/json"
+        else:
+            body, ctype = render(snap).encode(), "text/plain; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1"):
+    """Serve snapshots over HTTP from a daemon thread (local only by default)."""
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=httpd.serve_forever, name="stats",
+                     daemon=True).start()
+    print(f"[STATS] http://{host}:{port}/ (text) and /json")
+    return httpd
+
+
+def dump_every(seconds: float):
+    """Print a text snapshot every `seconds` from a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(seconds)
+            print(render(), end="", flush=True)
+    threading.Thread(target=loop, name="stats-dump", daemon=True).start()
@@ -0,0 +1,67 @@
+"""
+Treasure Grid – rate limits
+───────────────────────────
+Token buckets per connection and message type. A bucket refills `rate`
+tokens a second up to `burst`; every message takes one, and a message that
+finds its bucket empty is dropped and counted instead of handled.
+
+The server holds the limits as room ID (or "*" for every room) →
+{type: (rate, burst)}; types without an entry are never limited.
+
+    python server.py --limit CLICK=5/10 --limit tournament:CHAT=0.5/2
+"""
+
+DEFAULT_LIMITS = {                        # type → (per second, burst)
+    "CLICK":   (15, 30),
+    "CHAT":    (2, 5),
+    "VIEW":    (30, 60),
+    "NAME":    (2, 5),
+    "THEME":   (2, 5),
+    "READY":   (2, 5),
+    "PLAYERS": (1, 3),
+    "PING":    (2, 5),
+}
+RATE_LIMITS = {"*": DEFAULT_LIMITS}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.tokens = burst
+        self.stamp  = None
+
+    def take(self, now: float) -> bool:
+        """Spend one token if there is one (now: time.monotonic())."""
+        if self.stamp is not None:
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < 1: return False
+        self.tokens -= 1
+        return True
+
+
+def limits_for(config: dict, room_id: str) -> dict:
+    """type → (rate, burst) for one room: "*" overridden by its own entry."""
+    if not config: return {}
+    limits = {**config.get("*", {}), **config.get(room_id, {})}
+    return {typ: lim for typ, lim in limits.items() if lim}
+
+
+def parse_limit(spec: str) -> tuple:
+    """
+    "[ROOM:]TYPE=RATE[/BURST]" → (room or "*", TYPE, (rate, burst)).
+    BURST defaults to RATE; a RATE of 0 lifts the limit (limit None).
+    """
+    key, _, value = spec.partition("=")
+    room, _, typ = key.rpartition(":")
+    rate, _, burst = value.partition("/")
+    if not typ or not rate:
+        raise ValueError(f"expected [ROOM:]TYPE=RATE[/BURST], got {spec!r}")
+    rate = float(rate)
+    burst = float(burst) if burst else max(1.0, rate)
+    if rate < 0 or burst < 1:
+        raise ValueError(f"bad limit {spec!r}")
+    return room or "*", typ.upper(), ((rate, burst) if rate else None)
@@ -0,0 +1,367 @@
+"""
+Treasure Grid – spectator relay
+───────────────────────────────
+Watching a popular room should not slow down the people playing it. The
+relay is a separate process that joins each watched room once, as a hidden
+relay connection (JOIN {"relay": true}: never listed in PLAYERS or ranked),
+and fans that one stream out to any number of spectators on its own port:
+
+• a new spectator gets WELCOME, the roster and START / SNAPSHOT / GAMEOVER
+  built from the relay's mirror of the room, then the live stream;
+• --delay S holds everything back S seconds (the mirror too, so catching
+  up never shows what the stream has not shown yet);
+• --interval MS sends one frame per MS instead of one per event, keeping
+  only the newest SCORE per player and TIME in each, and dropping LOCKs
+  whose REVEAL is in the same frame;
+• every spectator has its own Outbox, so a slow one is evicted without
+  holding up the rest, and nothing a spectator sends reaches the server.
+
+    python relay.py 127.0.0.1:6000 --port 6200 --delay 2 --interval 250
+    python client.py 127.0.0.1 6200 lobby        # watch through the relay
+"""
+
+import argparse
+import collections
+import socket
+import threading
+import time
+
+from bot import BotClient
+from fanout import Outbox
+from room import DEFAULT_ROOM
+from standings import Standings
+from wire import (ENCODERS, FROM_CLIENT, JSON, WIRES, encode_json,
+                  negotiate, read_msg)
+
+# ─────────────────── configuration ───────────────────────────────────
+PORT        = 6200
+MAX_BACKLOG = 256 * 1024 # unsent bytes per spectator before it is evicted
+IDLE_WAIT   = 0.5        # seconds the pump sleeps with nothing pending
+
+
+# ────────────────── room mirror ──────────────────────────────────────
+class Mirror:
+    """The room as the spectators have seen it so far."""
+    def __init__(self):
+        self.roster   = {}                       # pid → PLAYERS entry
+        self.version  = 0
+        self.theme    = "Classic"
+        self.size     = 0
+        self.start    = None                     # START, while previewing
+        self.start_at = 0.0                      # monotonic arrival of START
+        self.chunks   = []                       # preview CHUNKs (large boards)
+        self.deadline = None                     # relay clock, after BEGIN
+        self.cells    = {}                       # cell index → [state, coins]
+        self.scores   = Standings()
+        self.gameover = None
+
+    def apply(self, m: dict):
+        t = m["type"]
+        if t == "PLAYERS":
+            self.roster  = {d["player"]: d for d in m["players"]}
+            self.version = m.get("version", 0)
+            self.theme   = m.get("theme", self.theme)
+        elif t == "PLAYERS_DIFF":
+            for d in m["set"]:    self.roster[d["player"]] = d
+            for pid in m["gone"]: self.roster.pop(pid, None)
+            self.version = m["version"]
+            self.theme   = m.get("theme", self.theme)
+        elif t == "START":
+            self.size, self.theme = m["size"], m.get("theme", self.theme)
+            self.start, self.start_at, self.chunks = m, time.monotonic(), []
+        elif t == "CHUNK" and m["preview"]:
+            self.chunks.append(m)
+        elif t == "CHUNK":
+            for dr, (vals, states) in enumerate(zip(m["coins"], m["state"])):
+                for dc, (coins, st) in enumerate(zip(vals, states)):
+                    if st:
+                        i = (m["row"] + dr) * self.size + m["col"] + dc
+                        self.cells[i] = [st, coins]
+        elif t == "BEGIN":
+            self.start, self.chunks = None, []
+            self.deadline = m.get("deadline") or time.time() + m.get("left", 0)
+        elif t == "TIME" and m.get("deadline"):
+            self.deadline = m["deadline"]
+        elif t == "SNAPSHOT":
+            self.size, self.theme = m["size"], m.get("theme", self.theme)
+            self.start    = None
+            self.deadline = m.get("deadline") or time.time() + m["left"]
+            self.cells    = {i: [st, coins] for i, st, coins in m.get("cells", ())}
+            self.scores   = Standings()
+            for pid, score in m["scores"]: self.scores.set(pid, score)
+        elif t == "LOCK":
+            self.cells[m["row"] * self.size + m["col"]] = [1, 0]
+        elif t == "REVEAL":
+            self.cells[m["row"] * self.size + m["col"]] = [2, m["coins"]]
+        elif t == "SCORE":
+            self.scores.set(m["player"], m["score"])
+        elif t == "GAMEOVER":
+            self.gameover = m
+
+    def players(self) -> dict:
+        return {"type": "PLAYERS", "version": self.version,
+                "players": list(self.roster.values()), "theme": self.theme}
+
+    def catch_up(self) -> list:
+        """What a spectator arriving now needs before the live stream."""
+        msgs = [self.players()]
+        if self.gameover:
+            msgs.append(self.gameover)
+        elif self.deadline is not None:
+            msgs.append({"type": "SNAPSHOT", "size": self.size,
+                         "theme": self.theme,
+                         "left": max(0, int(self.deadline - time.time())),
+                         "deadline": self.deadline,
+                         "scores": [[pid, sc] for pid, sc in self.scores.top()],
+                         "cells": [[i, st, coins] for i, (st, coins)
+                                   in sorted(self.cells.items())]})
+        elif self.start is not None:
+            left = self.start["preview"] - (time.monotonic() - self.start_at)
+            msgs.append({**self.start, "preview": round(max(0.0, left), 2)})
+            msgs.extend(self.chunks)
+        return msgs
+
+
+def coalesce(msgs: list) -> list:
+    """One frame's messages minus those a later one in it supersedes."""
+    last, revealed = {}, set()
+    for i, m in enumerate(msgs):
+        t = m["type"]
+        if t == "SCORE":    last[("SCORE", m["player"])] = i
+        elif t == "TIME":   last["TIME"] = i
+        elif t == "REVEAL": revealed.add((m["row"], m["col"]))
+    out = []
+    for i, m in enumerate(msgs):
+        t = m["type"]
+        key = ("SCORE", m["player"]) if t == "SCORE" else \
+              "TIME" if t == "TIME" else None
+        if key and last[key] != i: continue
+        if t == "LOCK" and (m["row"], m["col"]) in revealed: continue
+        out.append(m)
+    return out
+
+
+# ────────────────── one watched room ─────────────────────────────────
+class Feed:
+    """A single upstream subscription to one room, fanned out to spectators."""
+    def __init__(self, relay, room_id: str):
+        self.relay      = relay
+        self.room       = room_id
+        self.mirror     = Mirror()
+        self.spectators = []                     # {"sock", "wire", "out"}
+        self.served     = 0                      # spectators ever attached
+        self.frames     = 0
+        self.done       = False
+        self.opened     = threading.Event()      # open() finished, or failed
+        self.error      = None                   # why it failed
+        self.shift      = relay.delay            # server deadline → relay clock
+        self._pending   = collections.deque()    # (due, msg)
+        self._cond      = threading.Condition()  # guards _pending
+        self._lock      = threading.Lock()       # mirror + spectators
+        self.up = BotClient(relay.server_host, relay.server_port, name="relay",
+                            room=room_id, relay=True)
+
+    def open(self):
+        welcome = self.up.connect()
+        if welcome.get("clock"):
+            self.shift += time.time() - welcome["clock"]
+        self.up.start(self._upstream)
+        threading.Thread(target=self._pump, name=f"relay-{self.room}",
+                         daemon=True).start()
+
+    # ────────────────── upstream → pending ───────────────────────────
+    def _upstream(self, bot, m: dict):
+        if m["type"] == "PONG": return
+        if "clock" in m or "deadline" in m:      # re-base to the relay clock
+            m = {k: v for k, v in m.items() if k != "clock"}
+            if m.get("deadline"): m["deadline"] += self.shift
+        with self._cond:
+            self._pending.append((time.monotonic() + self.relay.delay, m))
+            self._cond.notify()
+
+    # ────────────────── pending → spectators ─────────────────────────
+    def _pump(self):
+        interval = self.relay.interval
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._pending and self._pending[0][0] <= now: break
+                    if self.up.closed and not self._pending: break
+                    wait = (self._pending[0][0] - now if self._pending
+                            else IDLE_WAIT)
+                    self._cond.wait(wait)
+                msgs = []
+                while self._pending and self._pending[0][0] <= now:
+                    msgs.append(self._pending.popleft()[1])
+            if not msgs: break                   # upstream gone, all sent
+            self._emit(coalesce(msgs) if interval else msgs)
+            if interval: time.sleep(interval)
+        self._finish()
+
+    def _emit(self, msgs: list):
+        with self._lock:
+            for m in msgs: self.mirror.apply(m)
+            frames, gone = {}, []
+            for s in self.spectators:
+                data = frames.get(s["wire"])
+                if data is None:
+                    enc  = ENCODERS[s["wire"]]
+                    data = frames[s["wire"]] = b"".join(enc(m) for m in msgs)
+                if not s["out"].put(data): gone.append(s)
+            for s in gone: self.spectators.remove(s)
+            self.frames += 1
+
+    def _finish(self):
+        with self._lock:
+            self.done = True
+            for s in self.spectators: s["out"].close(hangup=True)
+            self.spectators = []
+        self.relay._feed_done(self)
+
+    # ────────────────── spectators ───────────────────────────────────
+    def add(self, sock: socket.socket, wire: str):
+        """Attach a spectator; None if this feed already ended."""
+        s = {"sock": sock, "wire": wire,
+             "out": Outbox(sock, self.relay.max_backlog,
+                           name=f"spectator-{sock.fileno()}")}
+        with self._lock:
+            if self.done:
+                s["out"].close()
+                return None
+            s["out"].put(encode_json(
+                {"type": "WELCOME", "player": 0, "avatar": "📡",
+                 "spectator": True, "size": self.mirror.size or self.up.size,
+                 "wire": wire, "room": self.room, "clock": time.time()}))
+            enc = ENCODERS[wire]
+            s["out"].put(b"".join(enc(m) for m in self.mirror.catch_up()))
+            self.spectators.append(s)
+            self.served += 1
+        return s
+
+    def handle(self, s: dict, m: dict):
+        """The little a spectator may ask of the relay itself."""
+        t, enc = m.get("type"), ENCODERS[s["wire"]]
+        if t == "PING":
+            s["out"].put(enc({"type": "PONG", "t": m.get("t"),
+                              "clock": time.time()}))
+        elif t == "PLAYERS":
+            with self._lock:
+                s["out"].put(enc(self.mirror.players()))
+
+    def discard(self, s: dict):
+        with self._lock:
+            if s in self.spectators: self.spectators.remove(s)
+        s["out"].close()
+
+
+# =====================================================================
+class Relay:
+    def __init__(self, server: str = "127.0.0.1:6000", port: int = PORT,
+                 delay: float = 0.0, interval: float = 0.0,
+                 max_backlog: int = MAX_BACKLOG, wires=WIRES):
+        host, _, server_port = server.rpartition(":")
+        self.server_host = host or "127.0.0.1"
+        self.server_port = int(server_port)
+        self.port        = port
+        self.delay       = delay                 # seconds behind the room
+        self.interval    = interval              # seconds per frame, 0 = per event
+        self.max_backlog = max_backlog
+        self.wires       = wires
+        self.feeds       = {}                    # room id → Feed
+        self.lock        = threading.Lock()      # protects feeds
+
+    def feed_for(self, room_id: str) -> Feed:
+        """
+        The live feed for a room, subscribing to it if needed. The upstream
+        connect happens outside the lock, so a slow room only holds up its
+        own spectators; they wait for it and share its outcome.
+        """
+        with self.lock:
+            feed = self.feeds.get(room_id)
+            fresh = feed is None or feed.done
+            if fresh: feed = self.feeds[room_id] = Feed(self, room_id)
+        if not fresh:
+            feed.opened.wait()
+            if feed.error: raise feed.error
+            return feed
+        try:
+            feed.open()
+        except Exception as e:
+            with self.lock:
+                if self.feeds.get(room_id) is feed: del self.feeds[room_id]
+            feed.error = e
+            raise
+        finally:
+            feed.opened.set()
+        print(f"[RELAY] Subscribed to room {room_id!r} "
+              f"({len(self.feeds)} live)")
+        return feed
+
+    def _feed_done(self, feed: Feed):
+        with self.lock:
+            if self.feeds.get(feed.room) is feed: del self.feeds[feed.room]
+        print(f"[RELAY] Room {feed.room!r} ended: {feed.served} spectators, "
+              f"{feed.frames} frames")
+
+    def _spectator(self, conn: socket.socket):
+        file, feed, s = conn.makefile("rb"), None, None
+        try:
+            first = read_msg(file, FROM_CLIENT)
+            joined = isinstance(first, dict) and first.get("type") == "JOIN"
+            room_id = str(first.get("room") or DEFAULT_ROOM) if joined \
+                else DEFAULT_ROOM
+            wire = negotiate(first.get("wire"), self.wires) if joined else JSON
+            while s is None:
+                try:
+                    feed = self.feed_for(room_id)
+                except (OSError, ConnectionError) as e:
+                    conn.sendall(encode_json({"type": "ERROR", "msg":
+                                              f"relay: no game server ({e})"}))
+                    return
+                s = feed.add(conn, wire)
+            while True:
+                m = read_msg(file, FROM_CLIENT)
+                if m is None: break
+                if isinstance(m, dict): feed.handle(s, m)
+        except (ValueError, OSError):
+            pass
+        finally:
+            if s: feed.discard(s)
+            file.close(); conn.close()
+
+    def serve_forever(self):
+        with socket.create_server(("0.0.0.0", self.port)) as srv:
+            print(f"[RELAY] Relaying {self.server_host}:{self.server_port} "
+                  f"on {self.port} (delay {self.delay}s, "
+                  f"interval {self.interval * 1000:.0f} ms) …")
+            while True:
+                conn, _ = srv.accept()
+                threading.Thread(target=self._spectator, args=(conn,),
+                                 daemon=True).start()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treasure Grid spectator relay")
+    ap.add_argument("server", nargs="?", default="127.0.0.1:6000",
+                    help="game server HOST:PORT (default: %(default)s)")
+    ap.add_argument("--port", type=int, default=PORT,
+                    help="port spectators connect to (default: %(default)s)")
+    ap.add_argument("--delay", type=float, default=0.0, metavar="SECONDS",
+                    help="show everything SECONDS late (default: live)")
+    ap.add_argument("--interval", type=int, default=0, metavar="MS",
+                    help="send one coalesced frame per MS milliseconds "
+                         "(default: every event)")
+    ap.add_argument("--max-backlog", type=int, default=MAX_BACKLOG,
+                    metavar="BYTES",
+                    help="unsent bytes a spectator may fall behind before it "
+                         "is disconnected (default: %(default)s)")
+    ap.add_argument("--json-only", action="store_true",
+                    help="never negotiate the binary wire format")
+    args = ap.parse_args(argv)
+    Relay(args.server, args.port, args.delay, args.interval / 1000,
+          args.max_backlog, (JSON,) if args.json_only else WIRES).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
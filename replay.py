@@ -0,0 +1,200 @@
+"""
+Treasure Grid – replay
+──────────────────────
+Re-runs a round recorded with `server.py --log-dir DIR` (see eventlog.py).
+
+  verify   rebuild the board from the logged seed and push every logged
+           click through a real Room, checking that the layout, each
+           REVEAL's coins and each SCORE come out the same; runs as fast as
+           it can unless --speed paces it
+  dump     print the records
+  serve    stream the round to spectators at --speed × real time; watch it
+           with `python client.py 127.0.0.1 PORT`
+
+    python replay.py verify logs/*.tglog
+    python replay.py serve logs/lobby-20260101-120000-1234-1.tglog --speed 4
+"""
+
+import argparse
+import socket
+import sys
+import threading
+import time
+
+import eventlog as ev
+from board import Board
+from room import (AVATARS, CLOCK_INTERVAL, NullHost, PREVIEW_SECONDS,
+                  Player, Room, TIME_LIMIT)
+from wire import JSON, encode_json, read_msg
+
+
+def paced(events, speed: float = None):
+    """Yield events as they come, sleeping so they play at speed × real time."""
+    t0 = time.monotonic()
+    for e in events:
+        if speed:
+            delay = e[0] / 1000 / speed - (time.monotonic() - t0)
+            if delay > 0: time.sleep(delay)
+        yield e
+
+
+# ────────────────── verify ───────────────────────────────────────────
+def verify(path: str, speed: float = None) -> dict:
+    """Replay one log through the game logic; report any divergence."""
+    room, errors, records, last_ms = Room("replay", NullHost()), [], 0, 0
+    expect = {}                                  # pid → score after its REVEAL
+    t0 = time.perf_counter()
+    for ms, kind, f in paced(ev.read_events(path), speed):
+        records, last_ms = records + 1, ms
+        where = f"{ms} ms {ev.KINDS[kind]} {f if kind != ev.START else f[:3]}"
+        if kind == ev.JOIN:
+            token = next((t for t, seat in room.departed.items()
+                          if seat.pid == f[0]), None)  # a resumed seat
+            room.add(f[0], Player(), token)
+        elif kind == ev.LEAVE:
+            room.remove(f[0])
+        elif kind == ev.NAME:
+            room.handle(f[0], {"type": "NAME", "name": f[1]})
+        elif kind == ev.START:
+            size, seed, theme, coins = f
+            room.theme, room.game_started = theme, True
+            room.board = Board(size, seed)
+            if room.board.coins_bytes() != coins:
+                errors.append(f"{where}: seed does not reproduce the layout")
+        elif kind == ev.LOCK:
+            r, c, pid = f
+            room.handle(pid, {"type": "CLICK", "row": r, "col": c})
+            if room.board.owner[r * room.board.size + c] != pid:
+                errors.append(f"{where}: lock not granted on replay")
+        elif kind == ev.REVEAL:
+            r, c, pid, coins = f
+            p = room.players.get(pid) or room._held_seat(pid)
+            if p is None:
+                errors.append(f"{where}: no such player"); continue
+            before = p.score
+            room._reveal_square(pid, r, c)
+            expect[pid] = p.score
+            if expect[pid] - before != coins:
+                errors.append(f"{where}: replay awarded "
+                              f"{expect[pid] - before} coins")
+        elif kind == ev.SCORE:
+            pid, score = f
+            if expect.get(pid, score) != score:
+                errors.append(f"{where}: replay score is {expect[pid]}")
+            expect.pop(pid, None)
+    elapsed = time.perf_counter() - t0
+    return {"log": path, "records": records, "round_s": last_ms / 1000,
+            "replay_s": round(elapsed, 4),
+            "speedup": round(last_ms / 1000 / elapsed, 1) if elapsed else None,
+            "errors": errors}
+
+
+# ────────────────── spectator stream ─────────────────────────────────
+def messages(events):
+    """
+    Turn log records into (ms, message) pairs a client understands,
+    including PLAYERS after membership changes, a TIME every CLOCK_INTERVAL
+    after BEGIN (clients count down in between) and a GAMEOVER leaderboard
+    built from the last scores.
+    """
+    players, scores, begin, told = {}, {}, None, 0
+    for ms, kind, f in events:
+        while begin is not None and ms - begin >= told + CLOCK_INTERVAL * 1000:
+            told += CLOCK_INTERVAL * 1000
+            yield begin + told, {"type": "TIME",
+                                 "left": max(0, TIME_LIMIT - told // 1000)}
+        if kind in (ev.JOIN, ev.NAME, ev.LEAVE):
+            pid = f[0]
+            if kind == ev.LEAVE: players.pop(pid, None)
+            else: players[pid] = f[1] if kind == ev.NAME else f"P{pid}"
+            yield ms, {"type": "PLAYERS", "players": [
+                {"player": p, "name": n, "avatar": AVATARS[p % len(AVATARS)],
+                 "ready": True, "spectate": False} for p, n in players.items()]}
+        elif kind == ev.START:
+            size, seed, theme, coins = f
+            cells = memoryview(coins).cast("b")
+            yield ms, {"type": "START", "size": size, "theme": theme,
+                       "seed": seed,
+                       "layout": [cells[r * size:(r + 1) * size].tolist()
+                                  for r in range(size)],
+                       "preview": PREVIEW_SECONDS}
+        elif kind == ev.BEGIN:
+            begin = ms
+            yield ms, {"type": "BEGIN", "left": TIME_LIMIT}
+        elif kind == ev.LOCK:
+            yield ms, {"type": "LOCK", "row": f[0], "col": f[1], "player": f[2]}
+        elif kind == ev.REVEAL:
+            yield ms, {"type": "REVEAL", "row": f[0], "col": f[1],
+                       "player": f[2], "coins": f[3]}
+        elif kind == ev.SCORE:
+            scores[f[0]] = f[1]
+            yield ms, {"type": "SCORE", "player": f[0], "score": f[1]}
+        elif kind == ev.END:
+            board = sorted(scores.items(), key=lambda x: -x[1])
+            top = board[0][1] if board else 0
+            yield ms, {"type": "GAMEOVER",
+                       "leaderboard": [{"player": p, "name": players.get(
+                           p, f"P{p}"), "score": s} for p, s in board],
+                       "winners": [p for p, s in board if s == top]}
+
+
+def _spectate(conn: socket.socket, path: str, speed: float):
+    with conn, conn.makefile("rb") as f:
+        try:
+            read_msg(f)                          # the client's JOIN
+            conn.sendall(encode_json({"type": "WELCOME", "player": 0,
+                                      "avatar": "🎬", "spectator": True,
+                                      "wire": JSON, "room": f"replay {path}"}))
+            for _, m in paced(messages(ev.read_events(path)), speed):
+                conn.sendall(encode_json(m))
+        except (OSError, ValueError):
+            pass
+
+
+def serve(path: str, port: int, speed: float):
+    """Every spectator that connects gets the whole round from the start."""
+    with socket.create_server(("0.0.0.0", port)) as s:
+        print(f"[REPLAY] Streaming {path} at {speed}x on {port} …")
+        while True:
+            conn, _ = s.accept()
+            threading.Thread(target=_spectate, args=(conn, path, speed),
+                             daemon=True).start()
+
+
+# =====================================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treasure Grid replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    v = sub.add_parser("verify", help="re-run logs through the game logic")
+    v.add_argument("logs", nargs="+")
+    v.add_argument("--speed", type=float,
+                   help="pace at this multiple of real time (default: flat out)")
+    d = sub.add_parser("dump", help="print a log's records")
+    d.add_argument("log")
+    s = sub.add_parser("serve", help="stream a log to spectators")
+    s.add_argument("log")
+    s.add_argument("--port", type=int, default=6100)
+    s.add_argument("--speed", type=float, default=1.0)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "dump":
+        for ms, kind, f in ev.read_events(args.log):
+            if kind == ev.START: f = f[:3] + (f"<{len(f[3])} cells>",)
+            print(f"{ms:>9} {ev.KINDS[kind]:<7}", *f)
+        return 0
+    if args.cmd == "serve":
+        serve(args.log, args.port, args.speed)
+        return 0
+    failed = 0
+    for path in args.logs:
+        r = verify(path, args.speed)
+        print(f"[REPLAY] {path}: {r['records']} records, {r['round_s']}s round "
+              f"replayed in {r['replay_s']}s ({r['speedup']}x), "
+              f"{len(r['errors'])} mismatches")
+        for e in r["errors"]: print("   ", e)
+        failed += bool(r["errors"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
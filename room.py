@@ -0,0 +1,694 @@
+"""
+Treasure Grid – game room
+─────────────────────────
+One independent match: its own board, theme, timers and player set. The
+server owns the connections and hands each room a `host` with the transport
+hooks (_send_to, _call_later, _disconnect, _room_closed), open_log(), a
+BoardPool to deal from and its settings; NullHost is one with no network.
+A room lives until its round ends, then the server forgets it, so the same
+room ID can start a fresh match straight away.
+"""
+
+import collections
+import random
+import secrets
+import threading
+import time
+import traceback
+
+import metrics
+from fanout import Batcher
+from ratelimit import TokenBucket, limits_for
+from scheduler import Scheduler
+from standings import Standings
+from viewport import MAX_VIEW, ViewIndex
+from wire import ENCODERS, JSON, encode_json
+
+# ─────────────────── game configuration ──────────────────────────────
+BOARD_SIZE = 10
+TIME_LIMIT = 60          # seconds after BEGIN
+
+AVATARS = ["😎", "🤖", "🐱", "🐶", "🦄", "👾", "🦊", "🐼",
+           "🐸", "🐵", "🐯", "🐨", "🥸", "🦁", "🐙"]
+THEMES = ["Classic", "Spooky", "Space"]
+PREVIEW_SECONDS = 3
+REVEAL_DELAY    = 0.3    # seconds between LOCK and REVEAL
+LINGER_SECONDS  = 1      # after GAMEOVER, before connections are closed
+DEFAULT_ROOM    = "lobby"
+FULL_LAYOUT_MAX = 64     # larger boards send START without layout + CHUNKs
+RESYNC_INTERVAL = 1.0    # seconds between snapshots one client may ask for
+RELAY_MESSAGES  = {"RESYNC", "PING", "PLAYERS"}   # all a relay may send
+ROSTER_WINDOW   = 0.05   # seconds roster changes are collected per diff
+CHAT_INTERVAL   = 0.25   # seconds chat lines are collected per frame
+SEQ_INTERVAL    = 5      # seconds between SEQ counts during the round
+CLOCK_INTERVAL  = 15     # seconds between TIME drift corrections
+SEAT_FIELDS     = ("name", "avatar", "ready", "spectator", "score",
+                   "streak", "token",       # what a resumed seat gets back,
+                   "buckets")               # rate limits included
+
+
+# =====================================================================
+class Player:
+    """
+    One connection's seat. The server fills in the transport fields; the
+    rest is only ever written by the room's writer.
+    """
+    __slots__ = ("sock", "file", "out", "wire", "sent", "pid", "name",
+                 "avatar", "ready", "spectator", "relay", "score", "streak",
+                 "token", "seq", "resync_at", "buckets", "throttled",
+                 "evicted")
+
+    def __init__(self, sock=None, file=None, out=None, wire: str = JSON):
+        self.sock, self.file, self.out = sock, file, out
+        self.wire      = wire
+        self.sent      = 0                       # bytes written (asyncio)
+        self.pid       = 0
+        self.name      = ""
+        self.avatar    = ""
+        self.ready     = False
+        self.spectator = False
+        self.relay     = False
+        self.score     = 0
+        self.streak    = 0
+        self.token     = ""
+        self.seq       = 0                       # messages sent, for SEQ
+        self.resync_at = 0.0                     # last snapshot it asked for
+        self.buckets   = {}                      # type → TokenBucket
+        self.throttled = 0                       # messages dropped
+        self.evicted   = False                   # cut off as a slow consumer
+
+
+# =====================================================================
+class Room:
+    def __init__(self, room_id: str, host):
+        self.id           = room_id
+        self.host         = host
+        self.players      = {}                   # pid → Player
+        self.conns        = ()                   # players.values(), as of the
+                                                 # last join / leave
+        self.departed     = {}                   # resume token → left Player
+        self.size         = host.board_size
+        self.board        = None                 # dealt at START
+        self.views        = ViewIndex()          # VIEW subscriptions by tile
+        self.unviewed     = set()                # pids without a VIEW: get all
+        self.theme        = "Classic"
+        self.game_started = False
+        self.game_over    = False
+        self.start_time   = None                 # wall clock at BEGIN
+        self.deadline     = None                 # wall clock at the round's end
+        self.preview_end  = None                 # monotonic end of the preview
+        self.beats        = 0                    # SEQ heartbeats this round
+        self.cells        = {}                   # cell index → [state, coins]
+        self.version      = 0                    # bumped on every state change
+        self._snap        = (None, {})           # (key, wire → encoded)
+        self.standings    = Standings()          # ranked as scores change
+        self.roster_version = 0                  # bumped per PLAYERS_DIFF
+        self._roster      = set()                # pids changed since last diff
+        self._roster_theme = False               # theme changed since last diff
+        self._roster_timer = None
+        self.log          = host.open_log(room_id)   # EventLog or None
+        self.batcher      = (Batcher(host.batch_ms / 1000, self._call_later,
+                                     self._fan_out, self._fan_out_scoped)
+                             if host.batch_ms else None)
+        self.chat         = Batcher(CHAT_INTERVAL, self._call_later,
+                                    self._fan_out)
+        self.limits       = limits_for(host.rate_limits, room_id)
+        self.throttled    = collections.Counter()   # type → messages dropped
+        self._commands    = collections.deque()  # (fn, args) for the writer
+        self._wlock       = threading.Lock()     # held by the draining thread
+        self._writer      = None                 # that thread's ident
+        self._timer_fns   = {}                   # method → _command wrapper
+
+    # ────────────────── the single writer ────────────────────────────
+    def submit(self, fn, *args):
+        """
+        Run fn(*args) as the room's writer, after everything submitted
+        before it. Connections, timers and the server all come through
+        here, so the state needs no lock, and a command for a player who
+        has since left finds them gone instead of racing their removal.
+        The caller drains the queue itself if nobody else is; otherwise it
+        returns at once and the current writer runs fn.
+        """
+        commands = self._commands
+        commands.append((fn, args))
+        # whoever holds _wlock is the writer; re-check after releasing it,
+        # since a command may have arrived just before the release
+        while commands and self._wlock.acquire(False):
+            self._writer = threading.get_ident()
+            while commands:
+                fn, args = commands.popleft()
+                try:
+                    fn(*args)
+                except Exception:
+                    traceback.print_exc()
+            self._writer = None
+            self._wlock.release()
+
+    def call(self, fn, *args):
+        """submit() and wait for fn's return value (or exception)."""
+        if self._writer == threading.get_ident(): return fn(*args)
+        done, result = threading.Event(), []
+        def run():
+            try:
+                result.append((fn(*args), None))
+            except Exception as e:
+                result.append((None, e))
+            finally:
+                done.set()
+        self.submit(run)
+        done.wait()
+        value, error = result[0]
+        if error is not None: raise error
+        return value
+
+    def _command(self, fn):
+        """fn as a timer callback that runs through the writer."""
+        run = self._timer_fns.get(fn)
+        if run is None:
+            def run(*args): self.submit(fn, *args)
+            run.__name__ = fn.__name__           # timer.late.<name> metrics
+            self._timer_fns[fn] = run
+        return run
+
+    # ────────────────── helpers: host hooks ──────────────────────────
+    def _call_later(self, delay: float, fn, *args):
+        # fired through the writer; grouped by room so _finish_game cancels
+        # only this room's timers
+        return self.host._call_later(delay, self._command(fn), *args,
+                                     group=self)
+
+    def _send_msg(self, p: Player, msg: dict):
+        if metrics.enabled: metrics.count("out." + msg["type"])
+        p.seq += 1
+        self.host._send_to(p, ENCODERS[p.wire](msg))
+
+    # ────────────────── helpers: networking ──────────────────────────
+    def _broadcast(self, msg: dict):
+        if self.batcher: self.batcher.add(msg)
+        else:            self._fan_out(msg)
+
+    def _broadcast_cell(self, msg: dict):
+        """
+        LOCK / REVEAL: only to players whose view covers the cell. Boards
+        small enough to send whole have no viewports worth filtering by.
+        """
+        if self.size <= FULL_LAYOUT_MAX or not len(self.views):
+            return self._broadcast(msg)
+        # the audience is who watches the cell now, not when the batch flushes
+        pids = self.views.watchers(msg["row"], msg["col"]) | self.unviewed
+        if self.batcher: return self.batcher.add(msg, to=pids)
+        self._fan_out(msg, [p for p in self.conns if p.pid in pids])
+
+    def _fan_out_scoped(self, msgs: list, scoped: list):
+        """
+        A batch holding cell events, scoped as (index, pids): each player
+        gets the messages it can see, still as one frame. Players that get
+        the same events share one encoding. Grouping costs one step per
+        delivery plus one per connection.
+        """
+        got = {}                                 # pid → scoped indices it gets
+        for i, pids in scoped:
+            for pid in pids: got.setdefault(pid, []).append(i)
+        every = {i for i, _ in scoped}
+        groups = {}                              # scoped indices → players
+        for p in self.conns:
+            groups.setdefault(tuple(got.get(p.pid, ())), []).append(p)
+        for gets, players in groups.items():
+            skip = every.difference(gets)
+            mine = [m for i, m in enumerate(msgs) if i not in skip] \
+                   if skip else msgs
+            if mine:
+                self._fan_out(mine[0] if len(mine) == 1
+                              else {"type": "BATCH", "msgs": mine}, players)
+
+    def _fan_out(self, msg: dict, players: list = None):
+        sampling = metrics.enabled
+        if sampling: t0 = time.perf_counter()
+        encoded = {}                             # wire → bytes, encoded once
+        if players is None: players = self.conns
+        n = len(msg["msgs"]) if msg["type"] == "BATCH" else 1
+        send = self.host._send_to
+        for p in players:
+            wire = p.wire
+            data = encoded.get(wire)
+            if data is None:
+                data = encoded[wire] = ENCODERS[wire](msg)
+            p.seq += n
+            send(p, data)
+        if sampling:
+            metrics.observe("fanout.seconds", time.perf_counter() - t0)
+            for m in (msg["msgs"] if msg["type"] == "BATCH" else (msg,)):
+                metrics.count("out." + m["type"], len(players))
+            if msg["type"] == "BATCH": metrics.count("out.BATCH", len(players))
+
+    # ────────────────── helpers: roster ──────────────────────────────
+    @staticmethod
+    def _entry(pid: int, p: Player) -> dict:
+        return {"player": pid, "name": p.name, "avatar": p.avatar,
+                "ready": p.ready, "spectate": p.spectator}
+
+    def _send_player_list(self, p: Player):
+        """The whole roster, to one connection."""
+        self._send_msg(p, {"type": "PLAYERS", "version": self.roster_version,
+                           "players": [self._entry(pid, q) for pid, q
+                                       in self.players.items() if not q.relay],
+                           "theme": self.theme})
+
+    def _roster_changed(self, pid: int = None):
+        """
+        Queue pid (or the theme, if None) for the next PLAYERS_DIFF. The
+        roster goes out whole once per connection (PLAYERS, after WELCOME);
+        later joins, leaves and NAME / THEME / READY changes are collected
+        for ROSTER_WINDOW into one diff. A client that sees a version gap
+        asks for PLAYERS again.
+        """
+        if pid is None: self._roster_theme = True
+        else:           self._roster.add(pid)
+        if self._roster_timer is None:
+            self._roster_timer = self._call_later(ROSTER_WINDOW,
+                                                  self._flush_roster)
+
+    def _flush_roster(self):
+        self._roster_timer = None
+        changed, self._roster = self._roster, set()
+        theme, self._roster_theme = self._roster_theme, False
+        if not changed and not theme: return
+        self.roster_version += 1
+        players = self.players
+        diff = {"type": "PLAYERS_DIFF", "version": self.roster_version,
+                "set":  [self._entry(pid, players[pid])
+                         for pid in sorted(changed) if pid in players],
+                "gone": [pid for pid in sorted(changed) if pid not in players]}
+        if theme: diff["theme"] = self.theme
+        self._broadcast(diff)
+
+    # ────────────────── membership ───────────────────────────────────
+    # Called from connection threads: each is one command for the writer.
+    def add(self, pid: int, p: Player, resume: str = None,
+            relay: bool = False) -> int:
+        """
+        Seat a connection and return its player ID: pid, or the old ID of
+        the seat `resume` names. 0 if the room already finished.
+        """
+        return self.call(self._add, pid, p, resume, relay)
+
+    def join(self, pid: int, p: Player, resume: str = None,
+             relay: bool = False) -> int:
+        """add() and WELCOME as one command: nothing can overtake WELCOME."""
+        return self.call(self._join, pid, p, resume, relay)
+
+    def remove(self, pid: int):
+        """Unseat pid and return its Player (None if it had none)."""
+        return self.call(self._remove, pid)
+
+    def _add(self, pid: int, p: Player, resume: str, relay: bool) -> int:
+        """
+        Seat p and return its pid, or 0 once the round is over. A `resume`
+        token from an earlier WELCOME takes back the seat and score its
+        holder left mid-round. A relay (relay.py) gets every broadcast like
+        an unviewed spectator but is never listed, ranked or logged.
+        """
+        if self.game_over: return 0
+        held = self.departed.pop(resume, None) if resume else None
+        if relay:
+            p.name, p.avatar, p.relay = "relay", "📡", True
+            p.ready = p.spectator = True
+        elif held:
+            pid = held.pid
+            for k in SEAT_FIELDS: setattr(p, k, getattr(held, k))
+        else:
+            p.name, p.avatar = f"P{pid}", random.choice(AVATARS)
+            p.ready = p.spectator = bool(self.game_started)
+            p.token = secrets.token_hex(8)
+        p.pid = pid
+        self.players[pid] = p
+        self.conns = tuple(self.players.values())
+        self.unviewed.add(pid)
+        if relay: return pid
+        self.standings.set(pid, p.score)
+        if self.log: self.log.join(pid)
+        return pid
+
+    def _join(self, pid: int, p: Player, resume: str, relay: bool) -> int:
+        pid = self._add(pid, p, resume, relay)
+        if pid: self._welcome(pid, p)
+        return pid
+
+    def _welcome(self, pid: int, p: Player):
+        # WELCOME is always JSON: it tells the client which wire follows
+        if metrics.enabled: metrics.count("out.WELCOME")
+        p.seq += 1
+        self.host._send_to(p, encode_json(
+            {"type": "WELCOME", "player": pid, "avatar": p.avatar,
+             "spectator": p.spectator, "size": self.size, "wire": p.wire,
+             "room": self.id, "resume": p.token, "clock": time.time()}))
+        self._send_player_list(p)
+        if not p.relay: self._roster_changed(pid)
+        if self.game_started and not self.game_over:
+            self._catch_up(pid, p)
+
+    def _remove(self, pid: int):
+        p = self.players.pop(pid, None)
+        if p is None: return None
+        self.conns = tuple(self.players.values())
+        if self.game_over: return p
+        if self.game_started and not p.spectator:
+            self.departed[p.token] = p           # keeps scoring pending reveals
+        self.views.drop(pid); self.unviewed.discard(pid)
+        if p.relay: return p
+        self.standings.remove(pid)
+        if self.log: self.log.leave(pid)
+        self._roster_changed(pid); self._check_auto_win()
+        relays = [q for q in self.conns if q.relay]
+        if len(relays) == len(self.players) and not self.game_started:
+            self.game_over = True                # nobody left to play
+            if self.log: self.log.close()
+            for q in relays: self.host._disconnect(q)
+            self.host._room_closed(self)
+        return p
+
+    def _held_seat(self, pid: int):
+        """The seat pid left mid-round, waiting in `departed`, or None."""
+        return next((q for q in self.departed.values() if q.pid == pid), None)
+
+    # ────────────────── game flow control ────────────────────────────
+    def _maybe_start_game(self):
+        if self.game_started: return
+        seated = [p for p in self.players.values() if not p.spectator]
+        if not seated or not all(p.ready for p in seated):
+            return
+
+        # preview phase
+        self.game_started = True
+        self.board        = self.host.boards.take(self.size)   # pre-built
+
+        if self.log: self.log.start(self.board, self.theme)
+        start = {"type": "START", "size": self.size, "theme": self.theme,
+                 "seed": self.board.seed, "preview": PREVIEW_SECONDS}
+        self.preview_end  = time.monotonic() + PREVIEW_SECONDS
+        if self.size <= FULL_LAYOUT_MAX:
+            self._broadcast({**start, "layout": self.board.layout()})
+        else:
+            # large board: everyone gets the layout of what they look at
+            self._broadcast({**start, "chunked": True})
+            if self.batcher: self.batcher.flush()
+            for pid, p in self.players.items():
+                self._send_layout(pid, p)
+        self._call_later(PREVIEW_SECONDS, self._begin_round)
+
+    def _send_layout(self, pid: int, p: Player):
+        """
+        CHUNKs for pid's view. Without one (no client has a VIEW at START)
+        it gets the top-left MAX_VIEW square, never the whole board: one
+        CHUNK of a 2000² board is bigger than any client's send backlog.
+        """
+        tiles = self.views.view_of(pid)
+        if tiles is None:
+            tiles = self.views.tiles_for(0, 0, MAX_VIEW, MAX_VIEW, self.size)
+        self._send_tiles(p, tiles)
+
+    def _send_chunk(self, p: Player, row: int, col: int, rows: int, cols: int):
+        preview = self.start_time is None        # coins are public until BEGIN
+        coins, state = self.board.region(row, col, rows, cols, hide=not preview)
+        self._send_msg(p, {"type": "CHUNK", "row": row, "col": col,
+                           "rows": rows, "cols": cols, "preview": preview,
+                           "coins": coins, "state": state})
+
+    def _send_tiles(self, p: Player, tiles):
+        for key in sorted(tiles):
+            self._send_chunk(p, *self.views.bounds(key, self.size))
+
+    def _begin_round(self):
+        """
+        The round clock is a deadline, not a tick: WELCOME carries the
+        server's wall clock, BEGIN and SNAPSHOT the absolute deadline, and
+        clients count down locally. The end of the round is its only timer.
+        """
+        self.start_time = time.time()
+        self.deadline   = self.start_time + TIME_LIMIT
+        if self.log: self.log.begin()
+        self._broadcast({"type": "BEGIN", "left": TIME_LIMIT,
+                         "deadline": self.deadline})
+        self._call_later(TIME_LIMIT, self._finish_game)   # the only clock event
+        self._call_later(SEQ_INTERVAL, self._heartbeat)
+
+    def _time_left(self) -> int:
+        return max(0, TIME_LIMIT - int(time.time() - self.start_time))
+
+    def _heartbeat(self):
+        """SEQ counts, and now and then a TIME to correct client clocks."""
+        self.beats += 1
+        if self.beats * SEQ_INTERVAL % CLOCK_INTERVAL == 0:
+            self._broadcast({"type": "TIME", "left": self._time_left(),
+                             "deadline": self.deadline, "clock": time.time()})
+        self._send_seq()
+        self._call_later(SEQ_INTERVAL, self._heartbeat)
+
+    def _finish_game(self):
+        if self.game_over: return
+        self.game_over = True
+        self.host.scheduler.cancel_group(self)   # clock, reveals in flight
+        if self.log: self.log.end()
+        self._flush_roster()                     # their timers were just
+        self.chat.flush()                        # cancelled
+
+        players = self.players
+        leaderboard = [{"player": pid, "name": players[pid].name,
+                        "score": sc} for pid, sc in self.standings.top()
+                       if pid in players]
+        top = leaderboard[0]["score"] if leaderboard else 0
+        winners = [d["player"] for d in leaderboard if d["score"] == top]
+
+        self._broadcast({"type": "GAMEOVER",
+                        "leaderboard": leaderboard,
+                        "winners": winners})
+        if self.batcher: self.batcher.flush()   # its timer was just cancelled
+
+        print(f"[SERVER] Room {self.id!r} finished.")
+        self.host._call_later(LINGER_SECONDS, self._command(self._close))
+
+    # ────────────────── late join / resync ───────────────────────────
+    def _catch_up(self, pid: int, p: Player):
+        """
+        Bring a connection that joined mid-round up to date in one message:
+        START during the preview, else a SNAPSHOT of locks, reveals, scores
+        and time left.
+        """
+        if self.batcher: self.batcher.flush()   # nothing may overtake it
+        if self.start_time is None:             # still previewing
+            left = max(0.0, self.preview_end - time.monotonic())
+            start = {"type": "START", "size": self.size, "theme": self.theme,
+                     "seed": self.board.seed, "preview": round(left, 2)}
+            if self.size <= FULL_LAYOUT_MAX:
+                self._send_msg(p, {**start, "layout": self.board.layout()})
+            else:
+                self._send_msg(p, {**start, "chunked": True})
+                self._send_layout(pid, p)
+            return
+        self._send_snapshot(p)
+        if self.size > FULL_LAYOUT_MAX: self._send_layout(pid, p)
+
+    def _snapshot(self) -> dict:
+        players = self.players
+        msg = {"type": "SNAPSHOT", "size": self.size, "theme": self.theme,
+               "left": self._time_left(), "deadline": self.deadline,
+               "scores": [[pid, sc] for pid, sc in self.standings.top()
+                          if pid in players and not players[pid].spectator]}
+        if self.size <= FULL_LAYOUT_MAX:
+            msg["cells"] = [[i, st, coins] for i, (st, coins)
+                            in sorted(self.cells.items())]
+        else:
+            msg["chunked"] = True                # CHUNKs for the view follow
+        return msg
+
+    def _snapshot_bytes(self, wire: str) -> bytes:
+        """The encoded SNAPSHOT, rebuilt only after the state changed."""
+        key = (self.version, self._time_left(), len(self.players))
+        cached_key, encoded = self._snap
+        if cached_key != key:
+            encoded = {}
+            self._snap = (key, encoded)
+        data = encoded.get(wire)
+        if data is None:
+            data = encoded[wire] = ENCODERS[wire](self._snapshot())
+        return data
+
+    def _send_snapshot(self, p: Player):
+        # caller is in the round; the SEQ right after lets the client
+        # restart its count from a known value
+        data = self._snapshot_bytes(p.wire)
+        if metrics.enabled: metrics.count("out.SNAPSHOT")
+        p.seq += 1
+        self.host._send_to(p, data)
+        self.host._send_to(p, ENCODERS[p.wire]({"type": "SEQ", "seq": p.seq}))
+
+    def _send_seq(self):
+        """
+        Tell every connection how many messages it has been sent; a client
+        that counted differently missed something and asks for RESYNC.
+        """
+        if self.batcher: self.batcher.flush()
+        for p in self.conns:
+            self.host._send_to(p, ENCODERS[p.wire]({"type": "SEQ",
+                                                     "seq": p.seq}))
+
+    def _close(self):
+        if self.log: self.log.close()
+        for p in self.conns:
+            self.host._disconnect(p)
+        self.host._room_closed(self)
+
+    def _check_auto_win(self):
+        if self.game_started and len([p for p in self.players.values()
+                                      if not p.spectator]) < 2:
+            self._finish_game()
+
+    # ────────────────── message handler ──────────────────────────────
+    def handle(self, pid: int, msg: dict):
+        self.submit(self._handle, pid, msg)
+
+    def _handle(self, pid: int, msg: dict):
+        """
+        One message from pid. A relay may only send RELAY_MESSAGES; types
+        with a rate limit are dropped once pid's bucket is empty (_allow).
+        Chat lines are collected for CHAT_INTERVAL and go out as one frame.
+        """
+        p = self.players.get(pid);  typ = msg.get("type")
+        if metrics.enabled: metrics.count(f"in.{typ}")
+        if not p: return
+        if p.relay and typ not in RELAY_MESSAGES: return
+        limit = self.limits.get(typ)
+        if limit and not self._allow(p, typ, limit): return
+
+        if typ == "NAME" and not self.game_started:
+            p.name = msg.get("name", f"P{pid}")
+            if self.log: self.log.name(pid, p.name)
+            self._roster_changed(pid)
+
+        elif typ == "THEME" and not self.game_started:
+            requested = msg.get("theme", "Classic")
+            if requested in THEMES:
+                self.theme = requested; self._roster_changed()
+
+        elif typ == "READY" and not self.game_started and not p.spectator:
+            p.ready = True; self._roster_changed(pid); self._maybe_start_game()
+
+        elif typ == "PLAYERS":                   # client saw a version gap
+            self._send_player_list(p)
+
+        elif typ == "PING":                      # echo for round-trip time
+            self._send_msg(p, {"type": "PONG", "t": msg.get("t"),
+                               "clock": time.time()})
+
+        elif typ == "CHAT":
+            text = msg.get("msg", "").strip()
+            if text:
+                self.chat.add({"type": "CHAT", "player": pid,
+                               "name": p.name, "avatar": p.avatar,
+                               "msg": text})
+
+        elif typ == "VIEW":
+            try:
+                view = [int(msg[k]) for k in ("row", "col", "rows", "cols")]
+            except (KeyError, TypeError, ValueError):
+                return
+            fresh = self.views.set_view(pid,
+                                        self.views.tiles_for(*view, self.size))
+            self.unviewed.discard(pid)
+            if self.board and not self.game_over:   # catch up on new tiles
+                self._send_tiles(p, fresh)
+
+        elif typ == "RESYNC" and self.start_time and not self.game_over:
+            now = time.monotonic()
+            if now - p.resync_at >= RESYNC_INTERVAL:
+                p.resync_at = now
+                self._catch_up(pid, p)
+
+        elif typ == "CLICK" and self.game_started and not p.spectator:
+            r, c, size = msg.get("row"), msg.get("col"), self.size
+            if not (type(r) is int and type(c) is int
+                    and 0 <= r < size and 0 <= c < size):
+                return                           # off the board, or no cell
+            i = r * size + c
+            if i in self.cells:                  # already claimed
+                self.throttled["CLICK.claimed"] += 1
+                return
+            if self.board.lock_square(r, c, pid):
+                self.cells[i] = (1, 0)
+                self.version += 1
+                if self.log: self.log.lock(r, c, pid)
+                self._broadcast_cell({"type": "LOCK", "row": r, "col": c,
+                                      "player": pid})
+                self._call_later(REVEAL_DELAY, self._reveal_square, pid, r, c)
+
+    def _allow(self, p: Player, typ: str, limit: tuple) -> bool:
+        """Take a token from p's bucket for typ; count the message if empty."""
+        bucket = p.buckets.get(typ)
+        if bucket is None:
+            bucket = p.buckets[typ] = TokenBucket(*limit)
+        if bucket.take(time.monotonic()): return True
+        p.throttled += 1
+        self.throttled[typ] += 1
+        if metrics.enabled: metrics.count("throttled." + typ)
+        return False
+
+    # ────────────────── reveal helper ────────────────────────────────
+    def _reveal_square(self, pid, r, c):
+        val    = self.board.reveal_square(r, c, pid)
+        seated = pid in self.players
+        # a player who left since the click still gets the coins: they go
+        # to the seat held for them, unannounced until they resume it
+        p      = (self.players[pid] if seated
+                  else self._held_seat(pid) or Player())
+
+        if val == -1:
+            p.streak += 1
+            coins = -5 if p.streak == 3 else -1
+            if coins == -5: p.streak = 0
+        else:
+            p.streak = 0; coins = val
+
+        p.score += coins
+        if seated: self.standings.set(pid, p.score)
+        self.cells[r * self.size + c] = (2, coins)
+        self.version += 1
+        if self.log:
+            self.log.reveal(r, c, pid, coins); self.log.score(pid, p.score)
+        self._broadcast_cell({"type": "REVEAL", "row": r, "col": c,
+                              "player": pid, "coins": coins})
+        if seated:
+            self._broadcast({"type": "SCORE", "player": pid,
+                             "score": p.score})
+
+        if self.board.all_revealed(): self._finish_game()
+
+
+# =====================================================================
+class NullHost:
+    """
+    The hooks a Room needs from its server, with no network behind them:
+    for replays, benchmarks and stress runs. A frame goes to p.out.put()
+    when the player has an out, else it is only counted. Timers park on an
+    idle scheduler unless run_timers starts it.
+    """
+    rate_limits = None                           # nothing is throttled
+
+    def __init__(self, batch_ms: int = 0, board_size: int = BOARD_SIZE,
+                 boards=None, run_timers: bool = False):
+        self.batch_ms   = batch_ms
+        self.board_size = board_size
+        self.boards     = boards                 # BoardPool, or deal by hand
+        self.scheduler  = Scheduler()
+        self.sent       = 0                      # bytes with nowhere to go
+        if run_timers: self.scheduler.start()
+
+    def _send_to(self, p: Player, data: bytes):
+        if p.out is None: self.sent += len(data)
+        else:             p.out.put(data)
+
+    def _call_later(self, delay, fn, *args, group=None):
+        return self.scheduler.call_later(delay, fn, *args, group=group)
+
+    def open_log(self, room_id): return None
+    def _disconnect(self, p):    pass
+    def _room_closed(self, room): pass
@@ -0,0 +1,164 @@
+"""
+Treasure Grid – central scheduler
+─────────────────────────────────
+One heap of deadlines replaces the threading.Timer-per-event pattern: delayed
+reveals, ticks and the preview → BEGIN transition all live here.
+
+• Threaded servers call start() and one daemon thread fires every event.
+• Event-loop servers skip start() and drive run_due() / next_delay()
+  themselves, using the wakeup hook to learn about earlier deadlines.
+• Events may carry a group (e.g. a room) so cancel_group() can drop
+  everything one owner still has pending.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+import metrics
+
+
+class Timer:
+    """Handle for one scheduled call. cancel() is idempotent."""
+    __slots__ = ("when", "seq", "fn", "args", "group", "cancelled", "fired",
+                 "_sched")
+
+    def __init__(self, sched, when, seq, fn, args, group=None):
+        self.when, self.seq = when, seq
+        self.fn, self.args  = fn, args
+        self.group          = group
+        self.cancelled      = False
+        self.fired          = False
+        self._sched         = sched
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self):
+        self._sched._cancel(self)
+
+
+class Scheduler:
+    """Heap-backed timer queue with cancellation and event counters."""
+    def __init__(self, wakeup=None, clock=time.monotonic):
+        self.clock     = clock
+        self.wakeup    = wakeup            # called when the head moves earlier
+        self._heap     = []
+        self._groups   = {}                # group → set of live timers
+        self._seq      = itertools.count()
+        self._cond     = threading.Condition()
+        self._running  = False
+        self.scheduled = 0
+        self.fired     = 0
+        self.cancelled = 0
+
+    # ────────────────── public API ───────────────────────────────────
+    def call_later(self, delay: float, fn, *args, group=None) -> Timer:
+        with self._cond:
+            t = Timer(self, self.clock() + delay, next(self._seq), fn, args,
+                      group)
+            heapq.heappush(self._heap, t)
+            if group is not None:
+                self._groups.setdefault(group, set()).add(t)
+            self.scheduled += 1
+            earliest = self._heap[0] is t
+            if earliest: self._cond.notify()
+        if earliest and self.wakeup: self.wakeup()
+        return t
+
+    def cancel_all(self):
+        """Cancel every pending event."""
+        with self._cond:
+            for t in self._heap:
+                if not t.cancelled:
+                    t.cancelled = True; self.cancelled += 1
+            self._heap.clear()
+            self._groups.clear()
+
+    def cancel_group(self, group):
+        """Cancel every pending event scheduled with this group."""
+        with self._cond:
+            for t in self._groups.pop(group, ()):
+                if not t.cancelled and not t.fired:
+                    t.cancelled = True; self.cancelled += 1
+
+    @property
+    def pending(self) -> int:
+        return self.scheduled - self.fired - self.cancelled
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "fired": self.fired,
+                "cancelled": self.cancelled, "scheduled": self.scheduled}
+
+    # ────────────────── driving the queue ────────────────────────────
+    def next_delay(self):
+        """Seconds until the next live event, or None if nothing is queued."""
+        with self._cond:
+            self._drop_cancelled()
+            if not self._heap: return None
+            return max(0.0, self._heap[0].when - self.clock())
+
+    def run_due(self) -> int:
+        """Fire every event whose deadline has passed; return how many ran."""
+        ran = 0
+        while True:
+            with self._cond:
+                self._drop_cancelled()
+                if not self._heap or self._heap[0].when > self.clock():
+                    return ran
+                t = heapq.heappop(self._heap)
+                if metrics.enabled:              # how late it fires, per callback
+                    metrics.observe("timer.late." + getattr(
+                        t.fn, "__name__", "call"), self.clock() - t.when)
+                t.fired = True
+                self.fired += 1
+                self._forget(t)
+            try:
+                t.fn(*t.args)
+            except Exception:
+                traceback.print_exc()
+            ran += 1
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="scheduler",
+                         daemon=True).start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    # ────────────────── internals ────────────────────────────────────
+    def _cancel(self, t: Timer):
+        with self._cond:
+            if t.cancelled or t.fired: return
+            t.cancelled = True
+            self.cancelled += 1
+            self._forget(t)
+
+    def _forget(self, t: Timer):
+        # caller holds self._cond
+        if t.group is None: return
+        live = self._groups.get(t.group)
+        if live is not None:
+            live.discard(t)
+            if not live: del self._groups[t.group]
+
+    def _drop_cancelled(self):
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+
+    def _run(self):
+        while True:
+            self.run_due()
+            with self._cond:
+                if not self._running: return
+                self._drop_cancelled()
+                delay = (self._heap[0].when - self.clock()
+                         if self._heap else None)
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                if not self._running: return
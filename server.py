@@ -2,220 +2,211 @@
 Treasure Grid – server
 ──────────────────────
 • Classic / Spooky / Space themes, 3-second preview, spectators.
-• One round per launch; no “Play again / RESET” flow anymore.
+• Many rooms per process: JOIN {"room": id} joins (or creates) a room, and
+  a finished room is torn down without restarting the server.
+• `--asyncio` runs the same protocol on one event loop (see aio_server.py).
 """
 
+import argparse
 import json
-import random
 import socket
-import sys
 import threading
-import time
-from board import Board
+
+import metrics
+from boardpool import BoardPool
+from eventlog import EventLog
+from fanout import HARD_LIMIT, STALL_SECONDS, Outbox
+from ratelimit import RATE_LIMITS, parse_limit
+from room import BOARD_SIZE, DEFAULT_ROOM, Player, Room
+from scheduler import Scheduler
+from wire import FROM_CLIENT, JSON, WIRES, negotiate, read_msg
 
 # ─────────────────── configuration ───────────────────────────────────
 HOST = "0.0.0.0"
-PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
-BOARD_SIZE = 10
-TIME_LIMIT = 60          # seconds after BEGIN
-
-AVATARS = ["😎", "🤖", "🐱", "🐶", "🦄", "👾", "🦊", "🐼",
-           "🐸", "🐵", "🐯", "🐨", "🥸", "🦁", "🐙"]
-THEMES = ["Classic", "Spooky", "Space"]
-PREVIEW_SECONDS = 3
+PORT = 6000
+MAX_BACKLOG = 256 * 1024 # unsent bytes per client before it may be evicted
 
 # =====================================================================
 class TreasureServer:
-    def __init__(self):
-        self._init_state()
-        self.lock = threading.Lock()             # protects players dict
-
-    def _init_state(self):
-        self.next_id      = 1
-        self.players      = {}                   # pid → {...}
-        self.board        = Board(BOARD_SIZE)
-        self.theme        = "Classic"
-        self.game_started = False
-        self.start_time   = None
-        self.tick_handle  = None
-
-    # ────────────────── helpers: networking ──────────────────────────
-    def _broadcast(self, msg: dict):
-        data = (json.dumps(msg) + "\n").encode()
-        for p in list(self.players.values()):
-            try: p["sock"].sendall(data)
-            except OSError: pass
-
-    def _send_player_list(self):
-        payload = [
-            {"player": pid, "name": p["name"], "avatar": p["avatar"],
-             "ready": p["ready"], "spectate": p["spectator"]}
-            for pid, p in self.players.items()
-        ]
-        self._broadcast({"type": "PLAYERS", "players": payload,
-                         "theme": self.theme})
-
-    # ────────────────── game flow control ────────────────────────────
-    def _maybe_start_game(self):
-        if self.game_started: return
-        if not self.players:  return
-        if not all(p["ready"] for p in self.players.values()
-                   if not p["spectator"]):
-            return
-
-        # preview phase
-        self.game_started = True
-        self.board        = Board(BOARD_SIZE)      # fresh board
-
-        layout = [[sq.coins for sq in row] for row in self.board.grid]
-        self._broadcast({"type": "START", "size": BOARD_SIZE,
-                         "theme": self.theme, "layout": layout,
-                         "preview": PREVIEW_SECONDS})
-        threading.Timer(PREVIEW_SECONDS, self._begin_round).start()
-
-    def _begin_round(self):
-        self.start_time = time.time()
-        self._broadcast({"type": "BEGIN"})
-        self._tick_timer()
-
-    def _tick_timer(self):
-        remaining = TIME_LIMIT - int(time.time() - self.start_time)
-        self._broadcast({"type": "TIME", "left": max(0, remaining)})
-
-        if remaining <= 0 or self.board.all_revealed():
-            self._finish_game()
-        else:
-            self.tick_handle = threading.Timer(1, self._tick_timer)
-            self.tick_handle.start()
-
-    def _finish_game(self):
-        if self.tick_handle:
-            self.tick_handle.cancel()
-            self.tick_handle = None
-
-        board = sorted(((pid, p["score"]) for pid, p in self.players.items()),
-                    key=lambda x: -x[1])
-        leaderboard = [{"player": pid, "name": self.players[pid]["name"],
-                        "score": sc} for pid, sc in board]
-        top = leaderboard[0]["score"] if leaderboard else 0
-        winners = [d["player"] for d in leaderboard if d["score"] == top]
-
-        self._broadcast({"type": "GAMEOVER",
-                        "leaderboard": leaderboard,
-                        "winners": winners})
-
-        print("[SERVER] Game finished. Server shutting down…")
-        if hasattr(self, "server_socket"):
-            self.server_socket.close()  # this will unblock accept()
-
-        # give threads time to finish
-        threading.Timer(1, lambda: sys.exit(0)).start()
-
-    def _shutdown_server(self):
-        print("[SERVER] Shutting down…")
-        sys.exit(0)
-
-    def _check_auto_win(self):
-        if self.game_started and len([p for p in self.players.values()
-                                      if not p["spectator"]]) < 2:
-            self._finish_game()
+    def __init__(self, host: str = HOST, port: int = PORT,
+                 max_backlog: int = MAX_BACKLOG, batch_ms: int = 0,
+                 wires=WIRES, log_dir: str = None,
+                 board_size: int = BOARD_SIZE, rate_limits: dict = RATE_LIMITS):
+        self.host, self.port = host, port
+        self.max_backlog     = max_backlog
+        self.batch_ms        = batch_ms          # per-room BATCH window
+        self.wires           = wires             # formats offered at JOIN
+        self.log_dir         = log_dir           # per-room event logs, if set
+        self.board_size      = board_size        # cells per side in new rooms
+        self.rate_limits     = rate_limits       # room id / "*" → type → limit
+        self.next_id   = 1
+        self.rooms     = {}                      # room id → Room
+        self.lock      = threading.Lock()        # protects rooms, next_id
+        self.scheduler = Scheduler()             # reveals, round end, preview
+        self.boards    = BoardPool()             # pre-built, seeded boards
+        self.boards.warm(board_size)
+        self.ready     = threading.Event()       # set once adopt() works
+
+    # ────────────────── helpers: transport hooks ─────────────────────
+    # Subclasses with a different I/O model (aio_server.py) override these.
+    def _send_to(self, p: Player, data: bytes):
+        if not p.out.put(data):                  # never blocks
+            p.evicted = p.out.evicted
+
+    def _call_later(self, delay: float, fn, *args, group=None):
+        """Run fn(*args) after delay seconds; the handle has .cancel()."""
+        return self.scheduler.call_later(delay, fn, *args, group=group)
+
+    def _disconnect(self, p: Player):
+        """Close a connection once everything queued for it is sent."""
+        p.out.close(hangup=True)
+
+    def open_log(self, room_id: str):
+        """A fresh EventLog for a new room, or None when logging is off."""
+        return EventLog.for_room(self.log_dir, room_id) if self.log_dir else None
+
+    def queue_depths(self) -> dict:
+        """pid → {"msgs", "bytes"} still waiting in each client's outbox."""
+        return {p.pid: {"msgs": p.out.depth, "bytes": p.out.queued}
+                for room in list(self.rooms.values()) for p in room.conns}
+
+    def bytes_out(self, p: Player) -> int:
+        """Bytes handed to the kernel for one connection so far."""
+        return p.out.sent
+
+    def gauges(self) -> dict:
+        """Point-in-time numbers for the stats endpoint (metrics.py)."""
+        rooms = list(self.rooms.values())
+        g = {"rooms": len(rooms),
+             "players": sum(len(r.players) for r in rooms)}
+        g.update({f"scheduler.{k}": v for k, v in self.scheduler.stats().items()})
+        g.update({f"boards.{k}": v for k, v in self.boards.stats().items()})
+        for room in rooms:
+            for typ, n in list(room.throttled.items()):
+                g[f"throttled.{typ}"] = g.get(f"throttled.{typ}", 0) + n
+        for room in rooms:
+            for p in room.conns:
+                g[f"client.{p.pid}.bytes_out"] = self.bytes_out(p)
+        for pid, d in self.queue_depths().items():
+            g[f"client.{pid}.queued_bytes"] = d["bytes"]
+        return g
+
+    def start_stats(self, port: int = None, every: float = None):
+        """Turn sampling on; serve it on 127.0.0.1:port and/or print it."""
+        metrics.enable()
+        metrics.add_collector(self.gauges)
+        if port:  metrics.serve(port)
+        if every: metrics.dump_every(every)
+
+    def load(self) -> dict:
+        """Live rooms and connections (reported by cluster workers)."""
+        rooms = list(self.rooms.values())
+        return {"rooms": [r.id for r in rooms],
+                "players": sum(len(r.players) for r in rooms)}
+
+    # ────────────────── rooms ────────────────────────────────────────
+    def _room_for(self, room_id: str) -> Room:
+        """The live room with this ID, creating it if needed."""
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None or room.game_over:
+                room = self.rooms[room_id] = Room(room_id, self)
+                print(f"[SERVER] Room {room_id!r} opened "
+                      f"({len(self.rooms)} live)")
+            return room
+
+    def _room_closed(self, room: Room):
+        with self.lock:
+            # the ID may already belong to a newer room
+            if self.rooms.get(room.id) is room:
+                del self.rooms[room.id]
+        print(f"[SERVER] Room {room.id!r} closed ({len(self.rooms)} live)")
+
+    # ────────────────── connection lifecycle ─────────────────────────
+    def _register(self, sock, file, out, first):
+        """
+        Seat a new connection in the room named by its first message and
+        return (room, pid). Clients offer wire formats in JOIN
+        ({"wire": ["bin1", "json"]}); anything else gets JSON. A JOIN with
+        {"resume": token} takes back the seat that token was issued for;
+        {"relay": true} joins as a hidden spectator feed (see relay.py).
+        """
+        joined = isinstance(first, dict) and first.get("type") == "JOIN"
+        if joined and metrics.enabled: metrics.count("in.JOIN")
+        wire = negotiate(first.get("wire"), self.wires) if joined else JSON
+        room_id = str(first.get("room") or DEFAULT_ROOM) if joined \
+            else DEFAULT_ROOM
+        with self.lock:
+            pid = self.next_id; self.next_id += 1
+
+        resume = first.get("resume") if joined else None
+        relay  = bool(first.get("relay")) if joined else False
+        p = Player(sock, file, out, wire)
+        room = self._room_for(room_id)
+        while True:
+            seat = room.join(pid, p, resume, relay)
+            if seat: break
+            room = self._room_for(room_id)       # finished while we joined
+        back = " (resumed)" if seat != pid else ""
+        pid = seat
+        who = "Relay" if relay else "Player"
+        print(f"[SERVER] {who} {pid} connected to room {room_id!r}{back}")
+
+        if first and not joined:
+            room.handle(pid, first)
+        return room, pid
+
+    def _unregister(self, room: Room, pid: int):
+        # remove() waits for the writer, so an eviction by its last send
+        # is already recorded on the Player
+        p = room.remove(pid)
+        why = " (slow consumer, evicted)" if p and p.evicted else ""
+        if p and p.throttled: why += f" ({p.throttled} messages throttled)"
+        print(f"[SERVER] Player {pid} disconnected{why}")
 
     # ────────────────── per-client thread ────────────────────────────
     def _client_thread(self, conn: socket.socket):
-        file, pid = conn.makefile("r"), None
+        file, room, pid = conn.makefile("rb"), None, None
+        out = Outbox(conn, self.max_backlog, name=str(conn.fileno()))
         try:
-            with self.lock:
-                pid = self.next_id; self.next_id += 1
-                spectator = bool(self.game_started)
-                self.players[pid] = {
-                    "sock": conn, "file": file,
-                    "name": f"P{pid}", "avatar": random.choice(AVATARS),
-                    "ready": False if not spectator else True,
-                    "spectator": spectator,
-                    "score": 0, "streak": 0,
-                }
-                print(f"[SERVER] Player {pid} connected")
-
-
-            conn.sendall((json.dumps(
-                {"type": "WELCOME", "player": pid,
-                 "avatar": self.players[pid]["avatar"],
-                 "spectator": spectator, "size": BOARD_SIZE}) + "\n").encode())
-            self._send_player_list()
-
-            try:
-                for line in file:
-                    try:
-                        msg = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        continue
-                    self._handle_msg(pid, msg)
-            except (ConnectionResetError, OSError):
-                pass  # expected when shutting down
-
+            room, pid = self._register(conn, file, out, self._read(file))
+            while True:
+                msg = self._read(file)
+                if msg is None: break
+                if msg: room.handle(pid, msg)
         finally:
-            with self.lock:
-                if pid in self.players: self.players.pop(pid)
-                self._send_player_list(); self._check_auto_win()
-            print(f"[SERVER] Player {pid} disconnected")
-
-    # ────────────────── message handler ──────────────────────────────
-    def _handle_msg(self, pid: int, msg: dict):
-        p = self.players.get(pid);  typ = msg.get("type")
-        if not p: return
-
-        if typ == "NAME" and not self.game_started:
-            p["name"] = msg.get("name", f"P{pid}")
-            self._send_player_list()
-
-        elif typ == "THEME" and not self.game_started:
-            requested = msg.get("theme", "Classic")
-            if requested in THEMES:
-                self.theme = requested; self._send_player_list()
-
-        elif typ == "READY" and not self.game_started and not p["spectator"]:
-            p["ready"] = True; self._send_player_list(); self._maybe_start_game()
-
-        elif typ == "CHAT":
-            text = msg.get("msg", "").strip()
-            if text:
-                self._broadcast({"type": "CHAT", "player": pid,
-                                 "name": p["name"], "avatar": p["avatar"],
-                                 "msg": text})
-
-        elif typ == "CLICK" and self.game_started and not p["spectator"]:
-            r, c = msg["row"], msg["col"]
-            if self.board.lock_square(r, c, pid):
-                self._broadcast({"type": "LOCK", "row": r, "col": c,
-                                 "player": pid})
-                threading.Timer(0.3, self._reveal_square,
-                                args=(pid, r, c)).start()
-
-    # ────────────────── reveal helper ────────────────────────────────
-    def _reveal_square(self, pid, r, c):
-        val   = self.board.reveal_square(r, c, pid)
-        p     = self.players[pid]
-
-        if val == -1:
-            p["streak"] += 1
-            coins = -5 if p["streak"] == 3 else -1
-            if coins == -5: p["streak"] = 0
-        else:
-            p["streak"] = 0; coins = val
-
-        p["score"] += coins
-        self._broadcast({"type": "REVEAL", "row": r, "col": c,
-                         "player": pid, "coins": coins})
-        self._broadcast({"type": "SCORE", "player": pid,
-                         "score": p["score"]})
-
-        if self.board.all_revealed(): self._finish_game()
+            if pid is not None: self._unregister(room, pid)
+            out.close()
+            file.close(); conn.close()
+
+    @staticmethod
+    def _read(file):
+        """
+        Next message; {} for an unparsable line or one that is not an
+        object, None at EOF / bad frame.
+        """
+        try:
+            msg = read_msg(file, FROM_CLIENT)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {}
+        except (ValueError, OSError):
+            return None  # desynchronised stream, reset, or shutting down
+        return msg if msg is None or isinstance(msg, dict) else {}
 
     # ────────────────── main loop ────────────────────────────────────
-    def serve_forever(self):
-        with socket.create_server((HOST, PORT)) as s:
+    def adopt(self, conn: socket.socket):
+        """Serve a connection accepted elsewhere (see cluster.py)."""
+        threading.Thread(target=self._client_thread,
+                         args=(conn,), daemon=True).start()
+
+    def serve_forever(self, listen: bool = True):
+        self.scheduler.start()
+        self.ready.set()
+        if not listen:                           # connections come via adopt()
+            threading.Event().wait()
+        with socket.create_server((self.host, self.port)) as s:
             self.server_socket = s
-            print(f"[SERVER] Listening on {PORT} …")
+            print(f"[SERVER] Listening on {self.port} …")
             while True:
                 try:
                     conn, _ = s.accept()
@@ -226,5 +217,69 @@ class TreasureServer:
         print("[SERVER] Server loop ended.")
 
 # =====================================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treasure Grid server")
+    ap.add_argument("port", nargs="?", type=int, default=PORT)
+    ap.add_argument("--asyncio", action="store_true",
+                    help="serve every connection from one event loop "
+                         "instead of a thread per client")
+    ap.add_argument("--max-backlog", type=int, default=MAX_BACKLOG,
+                    metavar="BYTES",
+                    help="evict a client whose unsent backlog passes BYTES "
+                         f"while its socket is stalled ({STALL_SECONDS:g} s), "
+                         f"or passes {HARD_LIMIT}×BYTES at all; with "
+                         "--asyncio, as soon as it passes BYTES "
+                         "(default: %(default)s)")
+    ap.add_argument("--batch-ms", type=int, default=0, metavar="MS",
+                    help="coalesce broadcasts produced within MS "
+                         "milliseconds into one BATCH frame (default: off)")
+    ap.add_argument("--json-only", action="store_true",
+                    help="never negotiate the binary wire format")
+    ap.add_argument("--workers", type=int, default=0, metavar="N",
+                    help="accept on one port and spread rooms over N worker "
+                         "processes (see cluster.py; default: single process)")
+    ap.add_argument("--board-size", type=int, default=BOARD_SIZE, metavar="N",
+                    help="N×N board per room; above 64 clients get the layout "
+                         "in CHUNKs for their VIEW (default: %(default)s)")
+    ap.add_argument("--log-dir", metavar="DIR",
+                    help="write a binary event log per room into DIR "
+                         "(replay it with replay.py)")
+    ap.add_argument("--limit", action="append", type=parse_limit, default=[],
+                    metavar="[ROOM:]TYPE=RATE[/BURST]",
+                    help="allow TYPE messages at RATE per second per client, "
+                         "bursting to BURST, in ROOM or every room; RATE 0 "
+                         "lifts a limit (repeatable; see ratelimit.py)")
+    ap.add_argument("--no-limits", action="store_true",
+                    help="start without the default rate limits")
+    ap.add_argument("--stats-port", type=int, metavar="PORT",
+                    help="sample hot-path metrics and serve them over HTTP on "
+                         "127.0.0.1:PORT (workers use PORT, PORT+1, …)")
+    ap.add_argument("--stats-every", type=float, metavar="SECONDS",
+                    help="sample metrics and print them every SECONDS")
+    args = ap.parse_args(argv)
+
+    limits = {} if args.no_limits else {"*": dict(RATE_LIMITS["*"])}
+    for room_id, typ, limit in args.limit:
+        limits.setdefault(room_id, {})[typ] = limit
+    kwargs = dict(port=args.port, max_backlog=args.max_backlog,
+                  batch_ms=args.batch_ms,
+                  wires=(JSON,) if args.json_only else WIRES,
+                  log_dir=args.log_dir, board_size=args.board_size,
+                  rate_limits=limits)
+    if args.workers:
+        from cluster import Front
+        Front(args.workers, kwargs, args.asyncio,
+              stats=(args.stats_port, args.stats_every)).serve_forever()
+        return
+
+    cls = TreasureServer
+    if args.asyncio:
+        from aio_server import AsyncTreasureServer as cls
+    srv = cls(**kwargs)
+    if args.stats_port or args.stats_every:
+        srv.start_stats(args.stats_port, args.stats_every)
+    srv.serve_forever()
+
+
 if __name__ == "__main__":
-    TreasureServer().serve_forever()
\ No newline at end of file
+    main()
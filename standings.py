@@ -0,0 +1,52 @@
+"""
+Treasure Grid – standings
+─────────────────────────
+Players ranked by score, kept sorted as scores change instead of being
+re-sorted for every leaderboard. The server keeps one per room for GAMEOVER
+and SNAPSHOT; clients keep their own from the SCORE broadcasts to show live
+ranks.
+
+Keys are (-score, pid) in a list maintained with bisect: finding a player's
+slot is O(log n); the insert / delete shifts the list in one C memmove,
+which for rooms of a few thousand players is cheaper than any tree in
+Python.
+"""
+
+from bisect import bisect_left, insort
+
+
+class Standings:
+    def __init__(self):
+        self._keys  = []                         # sorted (-score, pid)
+        self._score = {}                         # pid → score
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._score
+
+    def set(self, pid: int, score: int):
+        old = self._score.get(pid)
+        if old == score: return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, pid))]
+        self._score[pid] = score
+        insort(self._keys, (-score, pid))
+
+    def remove(self, pid: int):
+        old = self._score.pop(pid, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, pid))]
+
+    def score(self, pid: int) -> int:
+        return self._score[pid]
+
+    def rank(self, pid: int) -> int:
+        """1-based place; ties share the best place of their score."""
+        return bisect_left(self._keys, (-self._score[pid],)) + 1
+
+    def top(self, n: int = None) -> list:
+        """[(pid, score), …] best first; ties by player ID."""
+        keys = self._keys if n is None else self._keys[:n]
+        return [(pid, -neg) for neg, pid in keys]
@@ -0,0 +1,166 @@
+"""
+Treasure Grid – stress checks
+─────────────────────────────
+Hammers the concurrent paths with many threads and verifies the invariants
+afterwards. Exits non-zero on the first violation.
+
+    python stress.py [--threads N] [--size N] [--rounds N]
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from board import Board, SquareState
+from boardpool import BoardPool
+from room import REVEAL_DELAY, TIME_LIMIT, NullHost, Player, Room
+
+
+def board_claims(threads: int, size: int, seed: int) -> list:
+    """
+    Every thread tries to lock and reveal every cell, in its own random
+    order. No square may be claimed or revealed twice, and the reveal must
+    belong to the player who holds the lock.
+    """
+    board   = Board(size, seed=seed)
+    locks   = [Counter() for _ in range(threads)]
+    reveals = [Counter() for _ in range(threads)]
+    start   = threading.Barrier(threads)
+
+    def player(pid):
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        random.Random(seed + pid).shuffle(cells)
+        start.wait()
+        for r, c in cells:
+            if board.lock_square(r, c, pid):
+                locks[pid - 1][r, c] += 1
+                # a rival's reveal on our lock must always be refused
+                board.reveal_square(r, c, pid % threads + 1)
+                if board.reveal_square(r, c, pid) == board.value(r, c):
+                    reveals[pid - 1][r, c] += 1
+
+    ts = [threading.Thread(target=player, args=(pid,))
+          for pid in range(1, threads + 1)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+
+    errors = []
+    all_locks, all_reveals = sum(locks, Counter()), sum(reveals, Counter())
+    for cell in all_locks.keys() | all_reveals.keys():
+        if all_locks[cell] != 1 or all_reveals[cell] != 1:
+            errors.append(f"cell {cell}: {all_locks[cell]} claims, "
+                          f"{all_reveals[cell]} reveals")
+    if board.revealed != size * size or not board.all_revealed():
+        errors.append(f"revealed counter {board.revealed} != {size * size}")
+    for pid, mine in enumerate(locks, 1):
+        for r, c in mine:
+            if board.owner[r * size + c] != pid:
+                errors.append(f"cell {(r, c)} owned by "
+                              f"{board.owner[r * size + c]}, claimed by {pid}")
+    if any(s != SquareState.REVEALED for s in board.state):
+        errors.append("cells left unrevealed")
+    return errors
+
+
+class _Frames(list):
+    """Every frame a player was sent, in order."""
+    put = list.append
+
+
+def room_disconnects(threads: int, size: int, seed: int) -> list:
+    """
+    Every thread clicks cells and drops its connection while its reveals
+    are still pending; half of them take their seat back mid-flight. Every
+    LOCK must still be followed by its REVEAL, each player's score (seated
+    or held for a resume) must equal the coins its REVEALs carried, and
+    the watcher's SEQ count must match the frames it was sent.
+    """
+    host    = NullHost(board_size=size, boards=BoardPool(depth=0),
+                       run_timers=True)
+    room    = Room("stress", host)
+    watcher = Player(out=_Frames())
+    room.add(threads + 1, watcher)
+    room.add(threads + 2, Player(out=_Frames()))    # two stay: no auto-win
+    tokens  = {pid: None for pid in range(1, threads + 1)}
+    for pid in tokens:
+        p = Player(out=_Frames())
+        room.add(pid, p); tokens[pid] = p.token
+    def deal():                              # straight into the round
+        room.game_started, room.board = True, Board(size, seed=seed)
+        room.start_time = time.time()
+        room.deadline   = room.start_time + TIME_LIMIT
+    room.call(deal)
+    start = threading.Barrier(threads)
+
+    def player(pid):
+        rng = random.Random(seed * 1000 + pid)
+        start.wait()
+        for visit in range(2 if pid % 2 else 1):
+            if visit: room.join(pid, Player(out=_Frames()), tokens[pid])
+            for _ in range(10):
+                room.handle(pid, {"type": "CLICK", "row": rng.randrange(size),
+                                  "col": rng.randrange(size)})
+                time.sleep(rng.random() * REVEAL_DELAY / 20)
+            room.remove(pid)                 # reveals still in flight
+            time.sleep(rng.random() * REVEAL_DELAY)
+
+    ts = [threading.Thread(target=player, args=(pid,))
+          for pid in range(1, threads + 1)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    deadline = time.monotonic() + 10 * REVEAL_DELAY + 5
+    while host.scheduler.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    room.call(lambda: None)                  # the writer has caught up
+    host.scheduler.stop()
+
+    msgs = [json.loads(line) for data in watcher.out
+            for line in data.splitlines()]
+    locks   = Counter((m["row"], m["col"]) for m in msgs if m["type"] == "LOCK")
+    reveals = Counter((m["row"], m["col"]) for m in msgs if m["type"] == "REVEAL")
+    coins   = Counter()
+    for m in msgs:
+        if m["type"] == "REVEAL": coins[m["player"]] += m["coins"]
+
+    errors = [f"cell {cell}: {locks[cell]} LOCKs, {reveals[cell]} REVEALs"
+              for cell in locks.keys() | reveals.keys()
+              if locks[cell] != 1 or reveals[cell] != 1]
+    for pid in tokens:
+        seat = room.players.get(pid) or room._held_seat(pid)
+        if seat is None:
+            errors.append(f"player {pid}: seat lost")
+        elif seat.score != coins[pid]:
+            errors.append(f"player {pid}: score {seat.score}, "
+                          f"REVEALs credited {coins[pid]}")
+    if watcher.seq != len(msgs):
+        errors.append(f"watcher SEQ {watcher.seq} != {len(msgs)} frames")
+    if host.scheduler.pending:
+        errors.append(f"{host.scheduler.pending} timers never fired")
+    return errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--size", type=int, default=60)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    for check, label in ((board_claims, "board claims "),
+                         (room_disconnects, "room leaves  ")):
+        for rnd in range(args.rounds):
+            errors = check(args.threads, args.size, seed=rnd)
+            print(f"{label} round {rnd + 1}/{args.rounds}: "
+                  f"{'ok' if not errors else f'{len(errors)} violations'}")
+            if errors:
+                print("\n".join(errors[:20]))
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
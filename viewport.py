@@ -0,0 +1,77 @@
+"""
+Treasure Grid – viewport subscriptions
+──────────────────────────────────────
+On a large board a client only shows part of the grid. It declares that
+part with VIEW {"row", "col", "rows", "cols"}; the room then sends the
+layout of just those cells (CHUNK messages, one per tile) and routes each
+LOCK / REVEAL only to players whose view covers the cell.
+
+ViewIndex buckets the board into TILE × TILE tiles and keeps, per tile, the
+set of players watching it, so finding the audience of a cell event is one
+dict lookup instead of a scan over every client. Players that never sent a
+VIEW are not in the index and keep receiving every event.
+"""
+
+import threading
+
+TILE     = 16         # cells per tile side
+MAX_VIEW = 128        # largest accepted viewport side, in cells
+
+
+class ViewIndex:
+    """pid → watched tiles, and tile → watching pids."""
+    def __init__(self, tile: int = TILE):
+        self.tile   = tile
+        self._tiles = {}                         # (tile row, tile col) → pids
+        self._views = {}                         # pid → frozenset of tiles
+        self._lock  = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._views
+
+    def tiles_for(self, row: int, col: int, rows: int, cols: int,
+                  size: int) -> frozenset:
+        """Tiles overlapping a viewport, clamped to the board and MAX_VIEW."""
+        rows, cols = min(rows, MAX_VIEW), min(cols, MAX_VIEW)
+        r0, c0 = max(0, row), max(0, col)
+        r1, c1 = min(size, row + rows), min(size, col + cols)
+        if r1 <= r0 or c1 <= c0: return frozenset()
+        t = self.tile
+        return frozenset((tr, tc) for tr in range(r0 // t, (r1 - 1) // t + 1)
+                         for tc in range(c0 // t, (c1 - 1) // t + 1))
+
+    def set_view(self, pid: int, tiles: frozenset) -> frozenset:
+        """Replace pid's view; returns the tiles it did not watch before."""
+        with self._lock:
+            old = self._views.get(pid, frozenset())
+            for key in old - tiles:
+                watchers = self._tiles[key]
+                watchers.discard(pid)
+                if not watchers: del self._tiles[key]
+            for key in tiles - old:
+                self._tiles.setdefault(key, set()).add(pid)
+            self._views[pid] = tiles
+            return tiles - old
+
+    def view_of(self, pid: int):
+        """pid's tiles, or None if it never sent a VIEW."""
+        return self._views.get(pid)
+
+    def drop(self, pid: int):
+        self.set_view(pid, frozenset())
+        with self._lock:
+            self._views.pop(pid, None)
+
+    def watchers(self, row: int, col: int) -> set:
+        """pids whose view covers (row, col)."""
+        t = self.tile
+        with self._lock:
+            return set(self._tiles.get((row // t, col // t), ()))
+
+    def bounds(self, key: tuple, size: int) -> tuple:
+        """(row, col, rows, cols) of one tile, clipped to the board."""
+        r, c = key[0] * self.tile, key[1] * self.tile
+        return r, c, min(self.tile, size - r), min(self.tile, size - c)
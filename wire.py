@@ -0,0 +1,282 @@
+"""
+Treasure Grid – wire formats
+────────────────────────────
+Two encodings share one stream:
+
+• JSON lines – `{"type": ...}\\n`, always understood by both sides.
+• bin1 – length-prefixed frames for the hot messages, negotiated at JOIN:
+
+      kind:u8  length:u32  payload[length]          (network byte order)
+
+  CLICK   row:u16 col:u16
+  LOCK    row:u16 col:u16 player:u32
+  REVEAL  row:u16 col:u16 player:u32 coins:i8
+  SCORE   player:u32 score:i32
+  TIME    left:u16 deadline:f64 clock:f64
+  START   header_len:u32 header(JSON, every field but layout)
+          layout(size*size signed bytes, row-major)
+  CHUNK   header_len:u32 header(JSON, every field but coins / state)
+          coins(rows*cols signed bytes) state(rows*cols bytes)
+  SNAPSHOT header_len:u32 header(JSON, every field but cells)
+          cells(index:u32 state:u8 coins:i8 per non-hidden cell)
+
+A JSON line always starts with "{" and no frame kind is 0x7B, so a reader can
+tell the two apart from the first byte. Messages that do not fit a binary
+schema (extra fields, other types) are sent as JSON even on a bin1 stream.
+
+Readers take the frame kinds they accept: servers pass FROM_CLIENT, so a
+client can only send CLICK frames, of exactly their size. Frames over
+MAX_FRAME and malformed payloads raise ValueError.
+
+Run `python wire.py` for an encode/decode microbenchmark.
+"""
+
+import json
+import struct
+from array import array
+from itertools import chain
+
+JSON, BIN1 = "json", "bin1"
+WIRES      = (BIN1, JSON)                    # server preference order
+
+_HEADER = struct.Struct("!BI")
+
+# kind → (type, struct, field names) for the fixed-size messages
+_FIXED = {
+    1: ("CLICK",  struct.Struct("!HH"),   ("row", "col")),
+    2: ("LOCK",   struct.Struct("!HHI"),  ("row", "col", "player")),
+    3: ("REVEAL", struct.Struct("!HHIb"), ("row", "col", "player", "coins")),
+    4: ("SCORE",  struct.Struct("!Ii"),   ("player", "score")),
+    5: ("TIME",   struct.Struct("!Hdd"),  ("left", "deadline", "clock")),
+}
+_START  = 6
+_CHUNK  = 7
+_SNAP   = 8
+_CELL   = struct.Struct("!IBb")
+_BY_TYPE = {typ: (kind, st, fields) for kind, (typ, st, fields) in _FIXED.items()}
+_U32     = struct.Struct("!I")
+
+ALL_KINDS   = frozenset(_FIXED) | {_START, _CHUNK, _SNAP}
+FROM_CLIENT = frozenset({1})                 # CLICK; the rest goes as JSON
+MAX_FRAME   = 16 * 1024 * 1024               # START / CHUNK of a 2000² board
+
+
+# ────────────────── encoding ─────────────────────────────────────────
+def encode_json(msg: dict) -> bytes:
+    return (json.dumps(msg) + "\n").encode()
+
+
+def encode_bin(msg: dict) -> bytes:
+    """bin1 frame for msg, or a JSON line if msg has no binary schema."""
+    typ = msg["type"]
+    spec = _BY_TYPE.get(typ)
+    if spec:
+        kind, st, fields = spec
+        if len(msg) == len(fields) + 1:
+            try:
+                payload = st.pack(*[msg[f] for f in fields])
+            except (KeyError, struct.error):
+                return encode_json(msg)
+            return _HEADER.pack(kind, len(payload)) + payload
+    elif typ == "START" and "layout" in msg:
+        header = json.dumps({k: v for k, v in msg.items()
+                             if k != "layout"}).encode()
+        cells  = array("b", chain.from_iterable(msg["layout"])).tobytes()
+        return (_HEADER.pack(_START, 4 + len(header) + len(cells))
+                + _U32.pack(len(header)) + header + cells)
+    elif typ == "CHUNK":
+        header = json.dumps({k: v for k, v in msg.items()
+                             if k not in ("coins", "state")}).encode()
+        cells  = (array("b", chain.from_iterable(msg["coins"])).tobytes()
+                  + bytes(chain.from_iterable(msg["state"])))
+        return (_HEADER.pack(_CHUNK, 4 + len(header) + len(cells))
+                + _U32.pack(len(header)) + header + cells)
+    elif typ == "SNAPSHOT" and "cells" in msg:
+        header = json.dumps({k: v for k, v in msg.items()
+                             if k != "cells"}).encode()
+        cells  = b"".join(_CELL.pack(*cell) for cell in msg["cells"])
+        return (_HEADER.pack(_SNAP, 4 + len(header) + len(cells))
+                + _U32.pack(len(header)) + header + cells)
+    elif typ == "BATCH":
+        # frames are self-delimiting, so a batch is just their concatenation
+        return b"".join(encode_bin(m) for m in msg["msgs"])
+    return encode_json(msg)
+
+
+ENCODERS = {JSON: encode_json, BIN1: encode_bin}
+
+
+# ────────────────── decoding ─────────────────────────────────────────
+def decode_frame(kind: int, payload: bytes) -> dict:
+    """Message for one frame; ValueError if the payload does not fit it."""
+    try:
+        return _decode(kind, payload)
+    except (struct.error, KeyError, TypeError, IndexError) as e:
+        raise ValueError(f"malformed frame of kind {kind}: {e}") from None
+
+
+def _check_header(kind: int, length: int, kinds=ALL_KINDS):
+    if kind not in kinds:
+        raise ValueError(f"unexpected frame kind {kind}")
+    fixed = _FIXED.get(kind)
+    if fixed and length != fixed[1].size:
+        raise ValueError(f"{fixed[0]} frame of {length} bytes")
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes exceeds {MAX_FRAME}")
+
+
+def _decode(kind: int, payload: bytes) -> dict:
+    if kind == _START:
+        (hlen,) = _U32.unpack_from(payload)
+        msg  = json.loads(payload[4:4 + hlen])
+        size = msg["size"]
+        flat = memoryview(payload)[4 + hlen:].cast("b")
+        msg["layout"] = [flat[r * size:(r + 1) * size].tolist()
+                         for r in range(size)]
+        return msg
+    if kind == _CHUNK:
+        (hlen,) = _U32.unpack_from(payload)
+        msg  = json.loads(payload[4:4 + hlen])
+        rows, cols = msg["rows"], msg["cols"]
+        n    = rows * cols
+        body = memoryview(payload)[4 + hlen:]
+        coins, state = body[:n].cast("b"), body[n:2 * n]
+        msg["coins"] = [coins[r * cols:(r + 1) * cols].tolist()
+                        for r in range(rows)]
+        msg["state"] = [state[r * cols:(r + 1) * cols].tolist()
+                        for r in range(rows)]
+        return msg
+    if kind == _SNAP:
+        (hlen,) = _U32.unpack_from(payload)
+        msg = json.loads(payload[4:4 + hlen])
+        msg["cells"] = [list(c) for c in _CELL.iter_unpack(payload[4 + hlen:])]
+        return msg
+    typ, st, fields = _FIXED[kind]
+    msg = dict(zip(fields, st.unpack(payload)))
+    msg["type"] = typ
+    return msg
+
+
+def read_msg(f, kinds=ALL_KINDS):
+    """
+    Read one message from a buffered binary file (sock.makefile("rb")),
+    accepting frames of `kinds`. Returns None at EOF; raises ValueError on
+    a malformed message.
+    """
+    while True:
+        first = f.peek(1)[:1]
+        if not first: return None
+        if first != b"{" and not first.isspace(): break
+        line = f.readline()
+        if not line: return None
+        if line.strip(): return json.loads(line)   # else a blank line: skip
+    return decode_frame(*_read_frame(f.read, kinds))
+
+
+def split_msgs(buf: bytearray, kinds=ALL_KINDS) -> list:
+    """
+    Decode every complete message at the front of buf (bytes straight off
+    a socket) and remove them from it; a partial one stays for the next
+    call. Unparsable JSON lines are skipped; raises ValueError on a
+    malformed frame.
+    """
+    msgs, pos, end = [], 0, len(buf)
+    while pos < end:
+        if buf[pos] == 0x7B or buf[pos] in b" \t\r\n":
+            nl = buf.find(b"\n", pos)
+            if nl < 0: break
+            line, pos = buf[pos:nl], nl + 1
+            if line.strip():
+                try:
+                    msgs.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    pass
+            continue
+        if end - pos < _HEADER.size: break
+        kind, length = _HEADER.unpack_from(buf, pos)
+        _check_header(kind, length, kinds)
+        if end - pos - _HEADER.size < length: break
+        start, pos = pos + _HEADER.size, pos + _HEADER.size + length
+        msgs.append(decode_frame(kind, buf[start:pos]))
+    del buf[:pos]
+    return msgs
+
+
+async def aread_msg(reader, kinds=ALL_KINDS):
+    """asyncio.StreamReader counterpart of read_msg()."""
+    import asyncio
+    while True:
+        try:
+            first = await reader.readexactly(1)
+        except asyncio.IncompleteReadError:
+            return None
+        if first == b"\n": continue             # blank line: skip
+        if first != b"{" and not first.isspace(): break
+        line = first + await reader.readline()
+        if line.strip(): return json.loads(line)
+    rest = await reader.readexactly(_HEADER.size - 1)
+    kind, length = _HEADER.unpack(first + rest)
+    _check_header(kind, length, kinds)
+    return decode_frame(kind, await reader.readexactly(length))
+
+
+def _read_frame(read, kinds=ALL_KINDS):
+    head = read(_HEADER.size)
+    if len(head) < _HEADER.size: raise ValueError("truncated frame")
+    kind, length = _HEADER.unpack(head)
+    _check_header(kind, length, kinds)
+    payload = read(length)
+    if len(payload) < length: raise ValueError("truncated frame")
+    return kind, payload
+
+
+def negotiate(offered, allowed=WIRES) -> str:
+    """Pick the first wire format in `allowed` that the client offered."""
+    offered = offered or ()
+    return next((w for w in allowed if w in offered), JSON)
+
+
+# ────────────────── microbenchmark ───────────────────────────────────
+def _bench(n: int = 20000, size: int = 100):
+    import io
+    import random
+    import time
+
+    def frames(encode, msgs, reps):
+        blob = b"".join(encode(m) for m in msgs)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            for m in msgs: encode(m)
+        t_enc = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            f = io.BufferedReader(io.BytesIO(blob))
+            while read_msg(f) is not None: pass
+        t_dec = time.perf_counter() - t0
+        count = len(msgs) * reps
+        return len(blob), t_enc / count * 1e6, t_dec / count * 1e6
+
+    rnd = random.Random(1)
+    hot = []
+    for i in range(n):
+        r, c, pid = rnd.randrange(size), rnd.randrange(size), rnd.randrange(1, 16)
+        hot += [{"type": "LOCK", "row": r, "col": c, "player": pid},
+                {"type": "REVEAL", "row": r, "col": c, "player": pid,
+                 "coins": rnd.choice((-5, -1, 1, 2, 3))},
+                {"type": "SCORE", "player": pid, "score": rnd.randint(-50, 200)}]
+    layout = [[rnd.choice((-1, 1, 2, 3)) for _ in range(size)]
+              for _ in range(size)]
+    start = [{"type": "START", "size": size, "theme": "Classic",
+              "layout": layout, "preview": 3}]
+
+    print(f"{'workload':<26}{'wire':<6}{'bytes':>10}"
+          f"{'enc µs/msg':>12}{'dec µs/msg':>12}")
+    for label, msgs, reps in ((f"LOCK/REVEAL/SCORE ×{n}", hot, 1),
+                              (f"START {size}x{size}", start, 50)):
+        for wire in (JSON, BIN1):
+            size_b, enc, dec = frames(ENCODERS[wire], msgs, reps)
+            print(f"{label:<26}{wire:<6}{size_b:>10}{enc:>12.2f}{dec:>12.2f}")
+
+
+if __name__ == "__main__":
+    _bench()